@@ -0,0 +1,168 @@
+"""Benchmark suite for the power and sample-size code paths.
+
+Each case reports the best and median wall time per call, calls per second
+and peak traced memory, and the report is written as JSON so two commits can
+be compared:
+
+    python benchmarks/bench_power.py --output before.json
+    git checkout feature && python benchmarks/bench_power.py --compare before.json
+
+``--compare`` exits non-zero when any case is slower than the baseline by
+more than ``--tolerance`` (a ratio, 1.25 by default).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from teachmichigan import calculator  # noqa: E402
+from teachmichigan.design import power_surface, required_fellows  # noqa: E402
+from teachmichigan.lookup import default_table  # noqa: E402
+from teachmichigan.simulate import simulate_power  # noqa: E402
+
+EFFECT_SIZES = np.arange(0.03, 0.25, 0.03)
+
+# The memoized entry points are benchmarked through __wrapped__ so every call
+# does the work; the cached path has its own case.
+_calculate_power = calculator.calculate_power.__wrapped__
+_calculate_sample_size = calculator.calculate_sample_size.__wrapped__
+
+
+def _streamlit_rerun():
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, 'power_calculator.py'), default_timeout=60)
+
+    def rerun():
+        app.run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+    return rerun
+
+
+def _cases():
+    cases = {
+        'power_scalar': (lambda: _calculate_power(25, 1.0, 0.12, use_clustering=True, icc=0.2), 200),
+        'power_scalar_cached': (lambda: calculator.calculate_power(25, 1.0, 0.12, use_clustering=True, icc=0.2), 2000),
+        'power_table': (lambda: _calculate_power(25, 1.0, EFFECT_SIZES, use_clustering=True, icc=0.2), 200),
+        'power_table_off_grid': (lambda: _calculate_power(25, 0.999, EFFECT_SIZES, use_clustering=True, icc=0.205), 200),
+        'power_table_auto_engine': (lambda: calculator.calculate_power_auto.__wrapped__(
+            1000, 1.0, EFFECT_SIZES, use_clustering=True, icc=0.05), 200),
+        'power_surface_100k': (lambda: power_surface(np.arange(1, 1001, 4), np.linspace(0.05, 1, 20), EFFECT_SIZES,
+                                                     np.arange(0, 0.51, 0.05)[:5]), 1),
+        'sample_size_scalar': (lambda: _calculate_sample_size(0.12, 1.0, use_clustering=True, icc=0.2), 200),
+        'sample_size_off_grid': (lambda: _calculate_sample_size(0.125, 0.999, use_clustering=True, icc=0.205), 20),
+        'sample_size_slider_grid': (lambda: required_fellows(EFFECT_SIZES[:, None, None],
+                                                             (np.arange(1, 101) / 100)[None, :, None], 22,
+                                                             icc=(np.arange(51) / 100)[None, None, :]), 5),
+        'mdes_curve_1000_fellows': (lambda: calculator.calculate_mdes_curve.__wrapped__(1.0, use_clustering=True,
+                                                                                        icc=0.2), 20),
+        'simulation_50_fellows_10k': (lambda: simulate_power(50, effect_size=EFFECT_SIZES, icc=0.2,
+                                                             replicates=10_000, seed=0), 1),
+    }
+    try:
+        cases['streamlit_rerun'] = (_streamlit_rerun(), 3)
+    except ImportError:
+        pass
+    return cases
+
+
+def run_case(func, number, repeat):
+    func()  # warm up imports and caches outside the timed region
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = min(times)
+    return {
+        'best_s': best,
+        'median_s': statistics.median(times),
+        'calls_per_s': 1 / best if best > 0 else float('inf'),
+        'peak_memory_bytes': peak,
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(selected=None, repeat=5):
+    report = {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'lookup_table': default_table() is not None,
+        'cases': {},
+    }
+    for name, (func, number) in _cases().items():
+        if selected and name not in selected:
+            continue
+        report['cases'][name] = run_case(func, number, repeat)
+        result = report['cases'][name]
+        print(f"{name:<28}{result['best_s'] * 1e3:>12.3f} ms{result['calls_per_s']:>14.1f}/s"
+              f"{result['peak_memory_bytes'] / 2 ** 20:>10.2f} MiB")
+    return report
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    print(f"\n{'case':<28}{'baseline ms':>14}{'current ms':>14}{'ratio':>8}")
+    for name, result in report['cases'].items():
+        if name not in baseline.get('cases', {}):
+            continue
+        before = baseline['cases'][name]['best_s']
+        ratio = result['best_s'] / before
+        flag = '  SLOWER' if ratio > tolerance else ''
+        print(f"{name:<28}{before * 1e3:>14.3f}{result['best_s'] * 1e3:>14.3f}{ratio:>8.2f}{flag}")
+        if ratio > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the power and sample-size code paths.')
+    parser.add_argument('cases', nargs='*', help='only run these cases')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='slowdown ratio that counts as a regression')
+    args = parser.parse_args(argv)
+
+    report = run(args.cases, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nregressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Cold-start benchmark for the power calculator.
+
+Each measurement runs in a fresh interpreter, like the first request after a
+container scales up from zero. Reports the import time of every heavy module
+(from ``python -X importtime``) and two end-to-end milestones:
+
+* ``first_paint`` -- importing what the page needs before the explanatory text
+* ``first_result`` -- running the whole page once, as for the first visitor,
+  through Streamlit's ``AppTest`` (the time includes importing streamlit)
+
+    python benchmarks/startup.py --repeat 5 --budget-first-paint 1.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['streamlit', 'numpy', 'pandas', 'scipy.special', 'teachmichigan.calculator']
+
+MILESTONES = {
+    'first_paint': 'import streamlit',
+    'first_result': ('from streamlit.testing.v1 import AppTest\n'
+                     "app = AppTest.from_file('power_calculator.py', default_timeout=60).run()\n"
+                     'assert not app.exception, app.exception'),
+}
+
+
+def _run(code, importtime=False):
+    args = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    start = time.perf_counter()
+    result = subprocess.run(args, cwd=ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f'{code!r} failed:\n{result.stderr}')
+    return elapsed, result.stderr
+
+
+def import_time(module):
+    """Cumulative import time of ``module`` in seconds, from ``-X importtime``."""
+    _, stderr = _run(f'import {module}', importtime=True)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        if name == module:
+            return int(cumulative) / 1e6
+    return 0.0
+
+
+def measure(repeat=3):
+    report = {'python': sys.version.split()[0], 'repeat': repeat, 'imports': {}, 'milestones': {}}
+    for module in MODULES:
+        try:
+            report['imports'][module] = statistics.median(import_time(module) for _ in range(repeat))
+        except RuntimeError:
+            report['imports'][module] = None
+    for name, code in MILESTONES.items():
+        report['milestones'][name] = statistics.median(_run(code)[0] for _ in range(repeat))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure cold-start import and first-result times.')
+    parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters per measurement (median is reported)')
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--budget-first-paint', type=float, help='fail if first_paint exceeds this many seconds')
+    parser.add_argument('--budget-first-result', type=float, help='fail if first_result exceeds this many seconds')
+    args = parser.parse_args(argv)
+
+    report = measure(args.repeat)
+    print(f"{'module':<28}{'import (s)':>12}")
+    for module, seconds in report['imports'].items():
+        print(f"{module:<28}{'not installed' if seconds is None else f'{seconds:.3f}':>12}")
+    print()
+    for name, seconds in report['milestones'].items():
+        print(f'{name:<28}{seconds:>12.3f}')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    budgets = {'first_paint': args.budget_first_paint, 'first_result': args.budget_first_result}
+    over = [name for name, budget in budgets.items()
+            if budget is not None and report['milestones'][name] > budget]
+    for name in over:
+        print(f'{name} took {report["milestones"][name]:.3f}s, over its {budgets[name]:.3f}s budget', file=sys.stderr)
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
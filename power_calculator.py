@@ -1,46 +1,10 @@
 import streamlit as st
-import numpy as np
-import pandas as pd
-from statsmodels.stats.power import TTestIndPower
-from statsmodels.stats.power import tt_ind_solve_power
+
+from teachmichigan import instrument
 
 # Set page config
 st.set_page_config(page_title="Power Calculator", page_icon="📊", layout="wide")
 
-def calculate_power(n_teachers, outcome_share, effect_size, students_per_teacher=22, use_clustering=False, icc=0):
-    n_treatment = int(n_teachers * outcome_share)
-    n_control = n_treatment  # Equal number in comparison group
-    
-    if use_clustering and icc > 0:
-        # Adjust for clustering
-        deff = 1 + (students_per_teacher - 1) * icc
-        effective_n_treatment = n_treatment * students_per_teacher / deff
-        effective_n_control = n_control * students_per_teacher / deff
-    else:
-        effective_n_treatment = n_treatment * students_per_teacher
-        effective_n_control = n_control * students_per_teacher
-    
-    power_analysis = TTestIndPower()
-    power = power_analysis.solve_power(
-        effect_size=effect_size,
-        nobs1=effective_n_treatment,
-        ratio=1,  # Equal sized groups
-        alpha=0.05,
-        alternative='two-sided'
-    )
-    return power
-
-def calculate_sample_size(effect_size, outcome_share, students_per_teacher=22, use_clustering=False, icc=0):
-    if use_clustering and icc > 0:
-        # Adjust for clustering
-        deff = 1 + (students_per_teacher - 1) * icc
-    else:
-        deff = 1
-    
-    n = tt_ind_solve_power(effect_size=effect_size, alpha=0.05, power=0.8, ratio=1, alternative='two-sided')
-    total_teachers = int(np.ceil((n * deff) / (students_per_teacher * outcome_share)))
-    return total_teachers * 2  # Double for equal sized intervention and comparison groups
-
 st.title('Interactive Power Calculator for TeachMichigan Evaluation')
 
 st.write("""
@@ -65,69 +29,319 @@ For context on effect sizes in education research, Kraft (2019) analyzed nearly
 Reference: Kraft, M. A. (2019). Interpreting Effect Sizes of Education Interventions. (EdWorkingPaper: 19-10). Retrieved from Annenberg Institute at Brown University: http://www.edworkingpapers.com/ai19-10
 """)
 
-calculation_type = st.radio("Select calculation type:", ("Calculate Power", "Calculate Required Sample Size"))
-
-if calculation_type == "Calculate Power":
-    n_teachers = st.slider('Number of TeachMichigan fellows:', 0, 1000, 25)
-    outcome_share = st.slider('Percentage of fellows associated with student outcomes:', 0, 100, 100) / 100
-
-    st.markdown(f'**Total number of teachers in the evaluation: {n_teachers * 2}**')
-    st.markdown(f'**Number of teachers in intervention group: {n_teachers}**')
-    st.write(f'Number of teachers in comparison group: {n_teachers}')
-    st.write(f'Effective number of teachers in intervention group: {int(n_teachers * outcome_share)}')
-    st.write(f'Effective number of teachers in comparison group: {int(n_teachers * outcome_share)}')
-
-else:
-    effect_size = st.slider('Effect Size:', 0.03, 0.24, 0.12, 0.03)
-    outcome_share = st.slider('Percentage of fellows associated with student outcomes:', 0, 100, 100) / 100
-
-use_clustering = st.radio("Account for clustering in calculations?", ("No", "Yes"))
-
-if use_clustering == "Yes":
-    st.write("""
-    Intraclass Correlation Coefficient (ICC):
-    The ICC measures the degree of correlation between observations within the same cluster (in this case, students within a teacher's classroom).
-    - A higher ICC (closer to 0.5) indicates that students within the same classroom are more similar to each other.
-    - A lower ICC (closer to 0) indicates that students within the same classroom are less similar to each other.
-    - Use a higher ICC if some teachers are believed to be meaningfully more effective than others within the treatment and control groups.
-    - Use a lower ICC if student outcomes are expected to be more independent of their teacher, or if teacher effectiveness is believed to be relatively uniform within the treatment and control groups.
-    - Note: An ICC can be as high as 1, but this calculator stops at 0.5 to allow the user to more easily make small adjustments with the slider.
-
-    Accounting for clustering (by using an ICC > 0) typically reduces the effective sample size, which can result in lower power or require a larger sample size. For guidance on the size of ICC to use, please refer to Hedges & Hedberg (2014) and Shen et al. (2022).
-    
-    References:
-    
-    Hedges, L. & Hedberg, E. C. (2014). Intraclass Correlations and Covariate Outcome Correlations for Planning Two- and Three-Level Cluster-Randomized Experiments in Education. Evaluation Review, 37(6): 435-554. https://doi.org/10.1177/0193841X14529126
-
-    Shen, Z., Curran, F. C., You, Y., Splett, J. W., & Zhang, H. (2022). Intraclass Correlations for Evaluating the Effects of Teacher Empowerment Programs on Student Educational Outcomes. Educational Evaluation and Policy Analysis, 45(1): 134-156. https://doi.org/10.3102/01623737221111400
-    """)
-
-    icc = st.slider('Intraclass Correlation Coefficient (ICC):', 0.0, 0.5, 0.2, 0.01)
-
-if calculation_type == "Calculate Power":
-    results = []
-    for effect_size in np.arange(0.03, 0.25, 0.03):
-        power = calculate_power(n_teachers, outcome_share, effect_size, use_clustering=(use_clustering=="Yes"), icc=icc if use_clustering=="Yes" else 0)
-        results.append({'Effect Size': effect_size, 'Power': power})
-
-    results_df = pd.DataFrame(results)
-    st.write('Power for different effect sizes:')
-    
+# Opt-in timings for diagnosing slow reruns (?debug=1 or TEACHMICHIGAN_DEBUG=1);
+# the calculator below reports on itself each time it runs
+debug = instrument.enabled(st.query_params)
+if debug:
+    instrument.configure_logging()
+
+# The inputs and results rerun on their own when a widget changes, so the
+# static text above and below is not re-sent on every slider drag
+@st.fragment
+def calculator():
+    rerun = instrument.Rerun()
+    calculation_type = st.radio("Select calculation type:", ("Calculate Power", "Calculate Required Sample Size", "Calculate Power Across Program Years", "Find the Most Powerful Design for a Budget"))
+
+    if calculation_type == "Calculate Power":
+        n_teachers = st.slider('Number of TeachMichigan fellows:', 0, 1000, 25)
+        outcome_share = st.slider('Percentage of fellows associated with student outcomes:', 0, 100, 100) / 100
+
+        st.markdown(f'**Total number of teachers in the evaluation: {n_teachers * 2}**')
+        st.markdown(f'**Number of teachers in intervention group: {n_teachers}**')
+        st.write(f'Number of teachers in comparison group: {n_teachers}')
+        st.write(f'Effective number of teachers in intervention group: {int(n_teachers * outcome_share)}')
+        st.write(f'Effective number of teachers in comparison group: {int(n_teachers * outcome_share)}')
+
+        attrition = st.checkbox('Account for teachers and students leaving the study')
+        if attrition:
+            st.write("""
+            Teachers who leave their school or the program before outcomes are measured, and students who move, reduce the sample the evaluation ends up with. This adds a "Power with Attrition" column: the power averaged over how many teachers and students might remain, assuming each leaves independently at the rates below. If the share of fellows who will be associated with student outcomes is not yet certain, the uncertainty can be set as a standard deviation around the percentage above.
+            """)
+            teacher_attrition = st.slider('Percentage of teachers leaving before outcomes are measured:', 0, 50, 10) / 100
+            student_attrition = st.slider('Percentage of students leaving before outcomes are measured:', 0, 50, 10) / 100
+            outcome_share_sd = 0.0
+            if 0 < outcome_share < 1:
+                max_sd = int(100 * (outcome_share * (1 - outcome_share)) ** 0.5) - 1
+                if max_sd > 0:
+                    outcome_share_sd = st.slider('Uncertainty in the percentage of fellows associated with student outcomes (standard deviation, percentage points):', 0, min(max_sd, 25), 0) / 100
+
+    elif calculation_type == "Calculate Required Sample Size":
+        effect_size = st.slider('Effect Size:', 0.03, 0.24, 0.12, 0.03)
+        outcome_share = st.slider('Percentage of fellows associated with student outcomes:', 0, 100, 100) / 100
+
+    elif calculation_type == "Calculate Power Across Program Years":
+        st.write("""
+        A new cohort of fellows joins the program each year, and each year every teacher still in the study is observed with a new class of students. This shows the power of an analysis that pools all years observed so far, at the end of each year, assuming one comparison teacher per fellow, with the same share of them associated with student outcomes, and that teachers who leave the study are replaced only by the next cohort. Students already observed stay in the analysis when their teacher leaves.
+        """)
+        cohort_size = st.slider('Number of fellows joining each year:', 0, 300, 25)
+        years = st.slider('Number of program years:', 1, 10, 5)
+        outcome_share = st.slider('Percentage of fellows associated with student outcomes:', 0, 100, 100) / 100
+        retention = st.slider('Percentage of teachers staying in the study from one year to the next:', 50, 100, 90) / 100
+
+    else:
+        st.write("""
+        Comparison teachers usually cost far less than fellows, so for a fixed budget the most powerful evaluation often has more comparison teachers than fellows. This finds the number of fellows, with the rest of the budget spent on comparison teachers, that gives the highest power for the effect size below.
+        """)
+        budget = st.number_input('Total budget ($):', min_value=0, value=1_000_000, step=50_000)
+        cost_fellow = st.number_input('Cost per fellow ($):', min_value=1, value=20_000, step=1_000)
+        cost_comparison = st.number_input('Cost per comparison teacher, e.g. for recruitment and data collection ($):', min_value=1, value=2_000, step=500)
+        effect_size = st.slider('Effect Size:', 0.03, 0.24, 0.12, 0.03)
+        outcome_share = st.slider('Percentage of fellows associated with student outcomes:', 0, 100, 100) / 100
+
+    use_clustering = st.radio("Account for clustering in calculations?", ("No", "Yes"))
+
+    icc_range, effect_size_sd = None, 0.0
+
+    if use_clustering == "Yes":
+        st.write("""
+        Intraclass Correlation Coefficient (ICC):
+        The ICC measures the degree of correlation between observations within the same cluster (in this case, students within a teacher's classroom).
+        - A higher ICC (closer to 0.5) indicates that students within the same classroom are more similar to each other.
+        - A lower ICC (closer to 0) indicates that students within the same classroom are less similar to each other.
+        - Use a higher ICC if some teachers are believed to be meaningfully more effective than others within the treatment and control groups.
+        - Use a lower ICC if student outcomes are expected to be more independent of their teacher, or if teacher effectiveness is believed to be relatively uniform within the treatment and control groups.
+        - Note: An ICC can be as high as 1, but this calculator stops at 0.5 to allow the user to more easily make small adjustments with the slider.
+
+        Accounting for clustering (by using an ICC > 0) typically reduces the effective sample size, which can result in lower power or require a larger sample size. For guidance on the size of ICC to use, please refer to Hedges & Hedberg (2014) and Shen et al. (2022).
+
+        References:
+
+        Hedges, L. & Hedberg, E. C. (2014). Intraclass Correlations and Covariate Outcome Correlations for Planning Two- and Three-Level Cluster-Randomized Experiments in Education. Evaluation Review, 37(6): 435-554. https://doi.org/10.1177/0193841X14529126
+
+        Shen, Z., Curran, F. C., You, Y., Splett, J. W., & Zhang, H. (2022). Intraclass Correlations for Evaluating the Effects of Teacher Empowerment Programs on Student Educational Outcomes. Educational Evaluation and Policy Analysis, 45(1): 134-156. https://doi.org/10.3102/01623737221111400
+        """)
+
+        icc = st.slider('Intraclass Correlation Coefficient (ICC):', 0.0, 0.5, 0.2, 0.01)
+
+        if calculation_type == "Calculate Power" and st.checkbox('Also show power averaged over a range of plausible ICCs'):
+            st.write("""
+            Because the ICC for a particular outcome is rarely known precisely, this adds an "Expected Power" column: the power averaged over every ICC in the range below, each treated as equally likely. Optionally, the effect size can be treated as uncertain too, as a normal distribution around each effect size in the table with the standard deviation below.
+            """)
+            icc_range = st.slider('Plausible range of the ICC:', 0.0, 0.5, (0.1, 0.3), 0.01)
+            effect_size_sd = st.slider('Uncertainty in the effect size (standard deviation):', 0.0, 0.1, 0.0, 0.01)
+
+    use_covariates = st.radio("Adjust for covariates such as prior test scores?", ("No", "Yes"))
+    r2_student, r2_teacher = 0.0, 0.0
+
+    if use_covariates == "Yes":
+        st.write("""
+        Controlling for covariates, most importantly students' prior achievement, removes part of the variation in outcomes and makes an effect of the same size easier to detect. The R² values below are the share of the variation the covariates explain:
+        - Student R²: the share of differences between students in the same classroom explained by the covariates. Prior-year test scores typically explain around half.
+        - Teacher R²: the share of differences between classrooms' average outcomes explained by the covariates. This only matters when accounting for clustering, and is often higher than the student R² because classroom averages of prior scores are very predictive.
+
+        Hedges & Hedberg (2014), referenced above, report typical values for both.
+        """)
+        r2_student = st.slider('Student-level R²:', 0.0, 0.9, 0.5, 0.05)
+        if use_clustering == "Yes":
+            r2_teacher = st.slider('Teacher-level R²:', 0.0, 0.9, 0.5, 0.05)
+
+    roster = st.file_uploader('Optional: upload class sizes to use instead of 22 students per teacher (one class size per line, or a CSV with a "class_size" column):', type=['csv', 'txt'])
+
+    # Numerical imports are deferred until here so a cold start puts the
+    # explanatory text on screen before NumPy, pandas and SciPy are loaded
+    with rerun.stage('imports'):
+        import numpy as np
+        import pandas as pd
+        from teachmichigan.calculator import calculate_budget_design, calculate_cohort_power, calculate_expected_power, calculate_mdes_curve, calculate_multiple_outcome_power, calculate_power, calculate_power_with_attrition, calculate_sample_size, calculate_simulated_power, design_effect
+        from teachmichigan.classsize import read_class_sizes
+        from teachmichigan.pipeline import Pipeline
+
+    # Each stage below is recomputed only when the values it depends on change;
+    # otherwise the result from this session's previous run is reused
+    pipeline = Pipeline(st.session_state.setdefault('pipeline', {}))
+    clustering_icc = icc if use_clustering == "Yes" else 0
+    # Keyword arguments shared by the calculations below
+    clustering = dict(use_clustering=(use_clustering == "Yes"), icc=clustering_icc)
+    covariates = dict(r2_student=r2_student, r2_teacher=r2_teacher)
+
+    class_sizes = None
+    if roster is not None:
+        roster.seek(0)
+        try:
+            class_sizes = pipeline.run('class_sizes', (roster.file_id,),
+                                       lambda: read_class_sizes(roster, column='class_size'))
+        except ValueError as error:
+            st.error(f'Could not read the class sizes: {error}')
+        else:
+            st.write(f'Using {class_sizes.count} class sizes: {class_sizes.mean:.1f} students per teacher on average, coefficient of variation {class_sizes.cv:.2f}. Unequal class sizes increase the design effect when accounting for clustering.')
+
+    students_per_teacher = 22 if class_sizes is None else class_sizes.mean
+    deff = pipeline.run('design_effect', (class_sizes, clustering_icc, r2_student, r2_teacher),
+                        lambda: design_effect(class_sizes=class_sizes, **clustering, **covariates))
+
+    effect_sizes = np.arange(0.03, 0.25, 0.03)
+
     def color_power(val):
         color = 'green' if val >= 0.8 else 'black'
         return f'color: {color}'
-    
-    st.dataframe(results_df.style.format({'Effect Size': '{:.2f}', 'Power': '{:.3f}'}).applymap(color_power, subset=['Power']))
 
-else:
-    required_teachers = calculate_sample_size(effect_size, outcome_share, use_clustering=(use_clustering=="Yes"), icc=icc if use_clustering=="Yes" else 0)
-    st.markdown(f'**Required number of teachers (total for both intervention and comparison groups): {required_teachers}**')
-    st.markdown(f'**Minimum number of fellows needed: {required_teachers // 2}**')
+    def style_power(df, power_columns):
+        # Effect sizes to two decimals, powers to three, adequate power in green
+        return (df.style.format({'Effect Size': '{:.2f}', **{column: '{:.3f}' for column in power_columns}})
+                .map(color_power, subset=list(power_columns)))
+
+    if calculation_type == "Calculate Power":
+        # Power only depends on the effective number of students per group, so
+        # slider moves that leave it unchanged reuse the previous table
+        effective_n = pipeline.run('effective_n', (n_teachers, outcome_share, students_per_teacher, deff),
+                                   lambda: int(n_teachers * outcome_share) * students_per_teacher / deff)
+        powers = pipeline.run(
+            'power_table', (effective_n,),
+            lambda: calculate_power(n_teachers, outcome_share, effect_sizes, class_sizes=class_sizes,
+                                    **clustering, **covariates))
+
+        power_columns = {'Power': powers}
+        if icc_range is not None:
+            power_columns['Expected Power'] = pipeline.run(
+                'expected_power', (int(n_teachers * outcome_share), students_per_teacher, class_sizes, icc_range,
+                                   effect_size_sd, r2_student, r2_teacher),
+                lambda: calculate_expected_power(n_teachers, outcome_share, effect_sizes, icc_low=icc_range[0],
+                                                 icc_high=icc_range[1], effect_size_sd=effect_size_sd,
+                                                 class_sizes=class_sizes, **covariates))
+
+        if attrition:
+            power_columns['Power with Attrition'] = pipeline.run(
+                'attrition', (n_teachers, outcome_share, teacher_attrition, student_attrition, outcome_share_sd,
+                              students_per_teacher, class_sizes, clustering_icc, r2_student, r2_teacher),
+                lambda: calculate_power_with_attrition(n_teachers, outcome_share, effect_sizes, teacher_attrition,
+                                                       student_attrition, outcome_share_sd, class_sizes=class_sizes,
+                                                       **clustering, **covariates))
+
+        results_df = pipeline.run(
+            'results_df', (effective_n, power_columns.get('Expected Power'), power_columns.get('Power with Attrition')),
+            lambda: pd.DataFrame({'Effect Size': effect_sizes, **power_columns}))
+        st.write('Power for different effect sizes:')
+
+        with rerun.stage('render_table'):
+            st.dataframe(style_power(results_df, power_columns))
+
+        if st.checkbox('Account for testing several student outcomes (for example math, ELA and attendance)'):
+            st.write("""
+            Testing several outcomes at the 0.05 level makes it likely that at least one shows a "significant" effect by chance, so evaluations adjust for the number of tests, which lowers the power for each outcome. The table below assumes the same effect size on every outcome and estimates, by simulating 10,000 evaluations, the power for each outcome, the power to detect an effect on at least one outcome, and the power to detect effects on all of them. Holm's and Bonferroni's corrections keep the chance of any false positive at 5%; Benjamini-Hochberg keeps the expected share of false positives among significant results at 5%. Outcomes that are more highly correlated behave more like a single outcome.
+            """)
+            outcomes = st.slider('Number of outcomes:', 2, 5, 3)
+            correlation = st.slider('Correlation between outcomes:', 0.0, 0.9, 0.5, 0.05)
+            correction = st.radio('Correction for multiple outcomes:', ('Holm', 'Bonferroni', 'Benjamini-Hochberg'))
+            correction = {'Holm': 'holm', 'Bonferroni': 'bonferroni', 'Benjamini-Hochberg': 'bh'}[correction]
+            multiple = pipeline.run(
+                'multiple_outcomes', (effective_n, outcomes, correlation, correction),
+                lambda: calculate_multiple_outcome_power(n_teachers, outcome_share, effect_sizes, outcomes, correlation,
+                                                         correction=correction, class_sizes=class_sizes,
+                                                         **clustering, **covariates))
+            multiple_df = pd.DataFrame({
+                'Effect Size': effect_sizes,
+                'Power per Outcome': multiple.per_outcome.mean(axis=-1),
+                'Power for at Least One': multiple.any,
+                'Power for All': multiple.all,
+            })
+            multiple_columns = ['Power per Outcome', 'Power for at Least One', 'Power for All']
+            with rerun.stage('render_multiple_outcomes'):
+                st.dataframe(style_power(multiple_df, multiple_columns))
+
+        fellows, mdes = pipeline.run(
+            'mdes_curve', (outcome_share, students_per_teacher, deff),
+            lambda: calculate_mdes_curve(outcome_share, class_sizes=class_sizes, **clustering, **covariates))
+        st.write('Minimum detectable effect size (the smallest effect with 80% power) for different numbers of fellows:')
+        with rerun.stage('render_chart'):
+            st.line_chart(pd.DataFrame({'Minimum detectable effect size': mdes}, index=pd.Index(fellows, name='Number of TeachMichigan fellows')))
+        if n_teachers >= 1 and np.isfinite(mdes[n_teachers - 1]):
+            st.write(f'With {n_teachers} fellows, the smallest effect size the evaluation can detect with 80% power is {mdes[n_teachers - 1]:.3f}.')
+
+        if st.checkbox('Check these results by simulation (slower)'):
+            st.write("""
+            The simulation generates 2,000 hypothetical evaluations with students nested in teachers, using the ICC above, and compares the average outcomes of fellows' and comparison teachers' classrooms. Unlike the table above, it reflects the number of teachers rather than only the number of students, which matters when there are few teachers. The interval shows the simulation's own margin of error.
+            """)
+            if int(n_teachers * outcome_share) < 2:
+                st.write('Simulation needs at least two fellows associated with student outcomes.')
+            else:
+                simulated = pipeline.run(
+                    'simulation', (int(n_teachers * outcome_share), clustering_icc, r2_student, r2_teacher),
+                    lambda: calculate_simulated_power(n_teachers, outcome_share, effect_sizes,
+                                                      **clustering, **covariates))
+                simulated_df = pd.DataFrame({
+                    'Effect Size': effect_sizes,
+                    'Simulated Power': simulated.power,
+                    '95% Interval': [f'{low:.3f} to {high:.3f}' for low, high in zip(simulated.ci_low, simulated.ci_high)],
+                })
+                with rerun.stage('render_simulation'):
+                    st.dataframe(style_power(simulated_df, ['Simulated Power']))
+
+    elif calculation_type == "Calculate Required Sample Size":
+        required_teachers = pipeline.run(
+            'required_teachers', (effect_size, outcome_share, students_per_teacher, deff),
+            lambda: calculate_sample_size(effect_size, outcome_share, class_sizes=class_sizes,
+                                          **clustering, **covariates))
+        if required_teachers is None:
+            st.error('No number of teachers reaches 80% power when no fellows are associated with student outcomes.')
+        else:
+            st.markdown(f'**Required number of teachers (total for both intervention and comparison groups): {required_teachers}**')
+            st.markdown(f'**Minimum number of fellows needed: {required_teachers // 2}**')
+
+    elif calculation_type == "Calculate Power Across Program Years":
+        cohorts = pipeline.run(
+            'cohort_power', (cohort_size, years, outcome_share, retention, students_per_teacher, clustering_icc,
+                             r2_student, r2_teacher),
+            lambda: calculate_cohort_power(cohort_size, years, effect_sizes, outcome_share, students_per_teacher,
+                                           retention=retention, **clustering, **covariates))
+        year_columns = [f'Year {year}' for year in range(1, years + 1)]
+        cohort_df = pd.DataFrame(cohorts.power, columns=year_columns)
+        cohort_df.insert(0, 'Effect Size', effect_sizes)
+        cohort_df['First Year with 80% Power'] = [f'Year {int(year)}' if np.isfinite(year) else f'Not within {years} years' for year in cohorts.first_adequate_year]
+        st.write('Power of the pooled analysis at the end of each year:')
+        with rerun.stage('render_table'):
+            st.dataframe(style_power(cohort_df, year_columns))
+        st.write(f'Fellows associated with student outcomes observed in each year: {", ".join(f"{fellows:.0f}" for fellows in cohorts.fellows[0])}.')
+
+        # Every cohort size at once, to compare recruitment plans
+        cohort_sizes = np.arange(5, 301, 5)
+        trajectories = pipeline.run(
+            'cohort_trajectories', (years, outcome_share, retention, students_per_teacher, clustering_icc,
+                                    r2_student, r2_teacher),
+            lambda: calculate_cohort_power(cohort_sizes[:, None], years, effect_sizes, outcome_share,
+                                           students_per_teacher, retention=retention, **clustering, **covariates))
+        first_years = pd.DataFrame(np.where(np.isfinite(trajectories.first_adequate_year), trajectories.first_adequate_year, np.nan), index=pd.Index(cohort_sizes, name='Number of fellows joining each year'), columns=[f'Effect size {effect:.2f}' for effect in effect_sizes])
+        st.write(f'First year with 80% power for different numbers of fellows joining each year (gaps mean 80% power is not reached within {years} years):')
+        with rerun.stage('render_chart'):
+            st.line_chart(first_years)
+
+    else:
+        try:
+            best = pipeline.run(
+                'budget_design', (budget, cost_fellow, cost_comparison, effect_size, outcome_share,
+                                  students_per_teacher, deff),
+                lambda: calculate_budget_design(budget, cost_fellow, cost_comparison, effect_size, outcome_share,
+                                                class_sizes=class_sizes, max_fellows=1000, **clustering, **covariates))
+        except ValueError:
+            st.error('The budget does not cover at least one fellow and one comparison teacher associated with student outcomes.')
+        else:
+            st.markdown(f'**Most powerful design: {best.fellows} fellows and {best.comparison_teachers} comparison teachers, with power {best.power:.3f}**')
+            st.write(f'Cost: ${best.cost:,.0f} of the ${budget:,.0f} budget. Effective number of teachers in intervention group: {int(best.fellows * outcome_share)}.')
+            power_by_fellows = best.surface.values[0, 0]
+            with rerun.stage('render_chart'):
+                st.line_chart(pd.DataFrame({'Power': power_by_fellows}, index=pd.Index(best.surface.coords['fellows'].astype(int), name='Number of TeachMichigan fellows')))
+            st.write('The chart shows the power for each number of fellows the budget allows, with the rest of the budget spent on comparison teachers.')
+
+    if debug:
+        report = rerun.summary(pipeline)
+        rerun.log(report)
+        # Written inside the fragment, which may only add to its own body
+        with st.expander('Performance of the last run', expanded=True):
+            st.write(f"Total: {report['total_seconds'] * 1000:.1f} ms")
+            st.dataframe(pd.DataFrame({'Milliseconds': report['stages']}).rename_axis('Stage') * 1000)
+            counts = report['counts']
+            st.write(f"Power evaluations: {counts.get('power_evaluations', 0)}  \n"
+                     f"Root finds: {counts.get('solves', 0)}  \n"
+                     f"Result cache: {counts.get('cache_hits', 0)} hits, {counts.get('cache_misses', 0)} misses  \n"
+                     f"Stages reused: {pipeline.hits} of {pipeline.hits + pipeline.misses}")
+
+calculator()
 
 st.write("""
 
 Understanding these results:
 - For power calculations: Higher power (closer to 1) indicates a greater likelihood of detecting an effect if it exists. Typically, a power of 0.80 or higher is considered adequate (80%+ chance of detecting an effect).
 - For sample size calculations: The result shows the total number of teachers needed (split equally between intervention and comparison groups) to achieve 80% power for detecting the specified effect size.
+- For calculations across program years: The results show the power at the end of each year for an analysis that pools every year observed so far, and the first year in which the power reaches 0.80.
+- For budget calculations: The result shows how to split the budget between fellows and comparison teachers to give the highest power. If even the best design has power well below 0.80, the budget is too small to reliably detect the specified effect size.
 
 """)
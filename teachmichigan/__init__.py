@@ -0,0 +1,22 @@
+"""Statistical core for the TeachMichigan power calculator.
+
+The public functions are loaded on first access so that ``import
+teachmichigan`` stays cheap for batch jobs that only need part of it.
+"""
+import importlib
+
+__all__ = ['calculate_mdes', 'calculate_power', 'calculate_sample_size', 'design_effect', 'power_surface']
+
+_EXPORTS = {
+    'calculate_mdes': 'calculator',
+    'calculate_power': 'calculator',
+    'calculate_sample_size': 'calculator',
+    'design_effect': 'calculator',
+    'power_surface': 'design',
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
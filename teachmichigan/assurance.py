@@ -0,0 +1,91 @@
+"""Assurance: power averaged over uncertainty in the ICC and effect size.
+
+A single ICC is rarely known; published compilations give a range. Here the
+ICC and, optionally, the effect size may be given as prior distributions
+instead of numbers, and the result is the expected power under those priors
+(also called assurance or probability of success).
+
+A prior is any object with a vectorized ``ppf`` method, such as a frozen
+``scipy.stats`` distribution. The expectation is computed with Gauss-Legendre
+quadrature on the quantile scale, ``E[power] = ∫ power(F⁻¹(u)) du``. All
+nodes, for both priors at once, are evaluated in one broadcast call to
+``design.teacher_power``. Power is a smooth function of both parameters, so
+the default 32 nodes per prior are accurate to about 1e-5 for bounded priors;
+priors with unbounded tails (a normal effect size) converge more slowly, to
+about 1e-4.
+"""
+import numpy as np
+
+from .design import teacher_power
+from .engine import as_result
+
+DEFAULT_NODES = 32
+
+
+def _is_prior(value):
+    return hasattr(value, 'ppf')
+
+
+def _quadrature(nodes):
+    # Gauss-Legendre nodes and weights mapped from [-1, 1] to the unit interval
+    x, w = np.polynomial.legendre.leggauss(nodes)
+    return (x + 1) / 2, w / 2
+
+
+def uniform_prior(low, high):
+    """Every value between ``low`` and ``high`` equally plausible."""
+    from scipy import stats
+
+    low, high = np.asarray(low, dtype=float), np.asarray(high, dtype=float)
+    return stats.uniform(loc=low, scale=high - low)
+
+
+def beta_prior(mean, sd):
+    """Beta distribution with the given mean and standard deviation, for ICCs."""
+    from scipy import stats
+
+    mean, sd = np.asarray(mean, dtype=float), np.asarray(sd, dtype=float)
+    if np.any(sd ** 2 >= mean * (1 - mean)):
+        raise ValueError('sd must be smaller than sqrt(mean * (1 - mean))')
+    concentration = mean * (1 - mean) / sd ** 2 - 1
+    return stats.beta(mean * concentration, (1 - mean) * concentration)
+
+
+def normal_prior(mean, sd):
+    """Normal distribution, for effect sizes."""
+    from scipy import stats
+
+    return stats.norm(loc=np.asarray(mean, dtype=float), scale=np.asarray(sd, dtype=float))
+
+
+def expected_power(n_teachers, outcome_share, effect_size, icc=0.0, students_per_teacher=22, alpha=0.05,
+                   class_size_cv=0.0, ratio=1.0, r2_student=0.0, r2_teacher=0.0, nodes=DEFAULT_NODES):
+    """``teacher_power`` averaged over priors for ``icc`` and/or ``effect_size``.
+
+    Either may be a number (or array), which is used as is, or a prior. The
+    result broadcasts over the fixed arguments and the priors' parameters
+    like ``teacher_power`` does; with no priors it equals ``teacher_power``.
+    """
+    priors = [name for name, value in (('effect_size', effect_size), ('icc', icc)) if _is_prior(value)]
+    values = {'effect_size': effect_size, 'icc': icc}
+    shapes = [np.shape(value) for value in (n_teachers, outcome_share, students_per_teacher, alpha, class_size_cv,
+                                            ratio, r2_student, r2_teacher)]
+    shapes += [np.shape(values[name].ppf(0.5)) if name in priors else np.shape(values[name])
+               for name in ('effect_size', 'icc')]
+    ndim = len(np.broadcast_shapes(*shapes))
+
+    # One leading quadrature axis per prior, ahead of the scenario axes
+    u, w = _quadrature(nodes)
+    for axis, name in enumerate(priors):
+        shape = [1] * (len(priors) + ndim)
+        shape[axis] = nodes
+        values[name] = values[name].ppf(u.reshape(shape))
+
+    power = teacher_power(n_teachers, outcome_share, values['effect_size'], students_per_teacher,
+                          icc=values['icc'], alpha=alpha, class_size_cv=class_size_cv, ratio=ratio,
+                          r2_student=r2_student, r2_teacher=r2_teacher)
+    power = np.asarray(power, dtype=float)
+    for _ in priors:
+        power = np.broadcast_to(power, (nodes,) + power.shape[1:])
+        power = np.tensordot(w, power, axes=(0, 0))
+    return as_result(power)
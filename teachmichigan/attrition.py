@@ -0,0 +1,109 @@
+"""Expected power when teachers and students leave mid-study.
+
+The analytic calculator links exactly ``int(n_teachers * outcome_share)``
+fellows, and the same share of comparison teachers, to outcomes and keeps
+every teacher and student to the end. Here each linked teacher, fellow or
+comparison, stays in the study with probability ``1 - teacher_attrition``.
+The outcome share itself may be uncertain: with ``outcome_share_sd > 0`` the
+number of linked teachers in each group is beta-binomial with that mean and
+standard deviation of the share.
+
+Expected power is the sum of power over every (retained fellows, retained
+comparison teachers) pair, weighted by its probability. The exact
+distributions are enumerated, tails with a combined probability below
+``tol`` are trimmed, and the whole grid is evaluated in one broadcast call
+to the power engine. Student attrition thins every class binomially, which
+lowers the mean class size and adds to its coefficient of variation in the
+design effect.
+"""
+import math
+
+import numpy as np
+
+from .design import comparison_teachers, design_effect
+from .engine import as_result, ttest_ind_power
+
+# Total probability dropped from each distribution before enumerating; power
+# is at most 1, so this also bounds the error in expected power
+DEFAULT_TOL = 1e-9
+
+
+def _trim(support, pmf, tol):
+    # Drop the least likely values while their combined probability stays
+    # within tol
+    order = np.argsort(pmf)
+    keep = np.ones(pmf.shape, dtype=bool)
+    keep[order[np.cumsum(pmf[order]) <= tol]] = False
+    return support[keep], pmf[keep] / pmf[keep].sum()
+
+
+def _thin(support, pmf, retention, tol):
+    # Distribution of Binomial(X, retention) for X with the given distribution,
+    # summing the binomial pmf (in logs, which is much faster than
+    # scipy.stats.binom) over the support of X
+    from scipy import special
+
+    if retention >= 1:
+        return support, pmf
+    x = support[:, None].astype(float)
+    kept = np.arange(support.max() + 1, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_binom = (special.gammaln(x + 1) - special.gammaln(kept + 1) - special.gammaln(x - kept + 1)
+                     + special.xlogy(kept, retention) + special.xlog1py(x - kept, -retention))
+    binom = np.where(kept <= x, np.exp(log_binom), 0.0)
+    return _trim(kept.astype(int), pmf @ binom, tol)
+
+
+def linked_distribution(n_teachers, outcome_share, outcome_share_sd=0.0, retention=1.0, tol=DEFAULT_TOL):
+    """Support and probabilities of the number of linked teachers still in the study."""
+    from scipy import stats
+
+    n = int(n_teachers)
+    if outcome_share_sd > 0:
+        variance = outcome_share_sd ** 2
+        if not 0 < outcome_share < 1 or variance >= outcome_share * (1 - outcome_share):
+            raise ValueError('outcome_share_sd must be smaller than sqrt(outcome_share * (1 - outcome_share))')
+        concentration = outcome_share * (1 - outcome_share) / variance - 1
+        support = np.arange(n + 1)
+        pmf = stats.betabinom.pmf(support, n, outcome_share * concentration, (1 - outcome_share) * concentration)
+        support, pmf = _trim(support, pmf, tol)
+    else:
+        support, pmf = np.array([math.floor(n * outcome_share)]), np.array([1.0])
+    return _thin(support, pmf, retention, tol)
+
+
+def retained_class_size(students_per_teacher=22, class_size_cv=0.0, student_attrition=0.0):
+    """Mean and coefficient of variation of class sizes after binomial student attrition."""
+    retention = 1 - np.asarray(student_attrition, dtype=float)
+    m = np.asarray(students_per_teacher, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cv = np.sqrt(np.asarray(class_size_cv, dtype=float) ** 2 + (1 - retention) / (m * retention))
+    return m * retention, cv
+
+
+def expected_power_with_attrition(n_teachers, outcome_share, effect_size, teacher_attrition=0.0,
+                                  student_attrition=0.0, students_per_teacher=22, icc=0.0, alpha=0.05,
+                                  class_size_cv=0.0, ratio=1.0, outcome_share_sd=0.0, r2_student=0.0,
+                                  r2_teacher=0.0, tol=DEFAULT_TOL):
+    """Power averaged over the teachers and students retained to the end of the study.
+
+    ``n_teachers``, ``outcome_share``, the attrition rates, ``ratio`` and
+    ``outcome_share_sd`` are single values; the remaining arguments
+    broadcast like ``teacher_power``. The study recruits
+    ``design.comparison_teachers(n_teachers, ratio)`` comparison teachers.
+    A design left with no teachers in either group has zero power.
+    """
+    retention = 1 - teacher_attrition
+    fellows, fellows_pmf = linked_distribution(n_teachers, outcome_share, outcome_share_sd, retention, tol)
+    comparison, comparison_pmf = linked_distribution(comparison_teachers(int(n_teachers), ratio), outcome_share,
+                                                     outcome_share_sd, retention, tol)
+
+    m, cv = retained_class_size(students_per_teacher, class_size_cv, student_attrition)
+    deff = np.asarray(design_effect(m, icc, cv, r2_student, r2_teacher))
+    k1, k0 = fellows[:, None].astype(float), comparison[None, :].astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        power = ttest_ind_power(np.asarray(effect_size, dtype=float)[..., None, None], k1 * m[..., None, None],
+                                deff=deff[..., None, None], alpha=alpha, ratio=k0 / k1)
+    power = np.where((k1 > 0) & (k0 > 0) & np.isfinite(power), power, 0.0)
+    weights = fellows_pmf[:, None] * comparison_pmf[None, :]
+    return as_result((power * weights).sum(axis=(-2, -1)))
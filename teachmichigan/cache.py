@@ -0,0 +1,130 @@
+"""Bounded LRU cache for calculator results, shared by every session.
+
+Streamlit re-executes the page script on each interaction, so anything kept in
+the script itself is lost between reruns. The cache lives in this module
+instead, which is imported once per server process and therefore shared by
+every rerun and every session on that process.
+"""
+import dataclasses
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .instrument import count
+
+DEFAULT_MAXSIZE = 4096
+DEFAULT_NDIGITS = 10
+
+
+def normalize(value, ndigits=DEFAULT_NDIGITS):
+    """Hashable, rounded form of an argument so equivalent inputs share a key."""
+    if isinstance(value, (bool, np.bool_, str)) or value is None:
+        return value
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        # + 0.0 folds -0.0 into 0.0
+        return round(float(value), ndigits) + 0.0
+    if isinstance(value, (np.ndarray, list, tuple)) or hasattr(value, '__array__'):
+        # Lists, tuples and array-likes such as pandas Series key by values
+        array = np.asarray(value)
+        if array.dtype.kind in 'fc':
+            array = np.round(array, ndigits) + 0.0
+        return (array.shape, tuple(array.ravel().tolist()))
+    return value
+
+
+def freeze(value):
+    """Make the arrays in a result read-only, including inside tuples, lists, dicts and dataclasses.
+
+    Cached results are shared by every session, so an in-place change by one
+    caller would otherwise show up in the results of all the others.
+    """
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            freeze(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            freeze(item)
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        for field in dataclasses.fields(value):
+            freeze(getattr(value, field.name))
+    return value
+
+
+class ResultCache:
+    """Thread-safe LRU mapping with hit and miss counters."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                count('cache_hits')
+                return self._data[key]
+            self.misses += 1
+        count('cache_misses')
+        # Compute outside the lock so slow misses do not block other sessions;
+        # two sessions missing on the same key at once just both compute it.
+        value = freeze(compute())
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+results = ResultCache()
+
+
+def memoize(func=None, *, cache=None, ndigits=DEFAULT_NDIGITS):
+    """Cache ``func`` by its normalized arguments in ``cache`` (``results`` by default).
+
+    Entries are keyed by the function's module and qualified name, so a
+    function redefined by a Streamlit rerun still hits the entries created
+    by the previous run.
+    """
+    if func is None:
+        return functools.partial(memoize, cache=cache, ndigits=ndigits)
+    store = results if cache is None else cache
+    signature = inspect.signature(func)
+    name = (func.__module__, func.__qualname__)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = name + tuple((arg, normalize(value, ndigits)) for arg, value in bound.arguments.items())
+        try:
+            hash(key)
+        except TypeError:
+            # An argument with no hashable form is computed every time
+            return func(*args, **kwargs)
+        return store.get_or_compute(key, lambda: func(*args, **kwargs))
+
+    wrapper.cache = store
+    return wrapper
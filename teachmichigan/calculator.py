@@ -0,0 +1,201 @@
+"""Headless entry points behind the Streamlit power calculator.
+
+These are the functions the app calls, with the app's conventions: clustering
+is a flag, the comparison group matches the fellows one to one, and sample
+sizes are reported as total teachers across both groups. Importing this
+module has no side effects and pulls in only NumPy; SciPy is loaded on the
+first calculation.
+
+``ratio`` is the number of comparison teachers per fellow (1 for the equal
+groups the app assumes; see ``design.comparison_teachers``). ``class_sizes``
+optionally replaces the fixed ``students_per_teacher`` with a roster: a
+``ClassSizeSummary`` or an array of class sizes. ``r2_student`` and
+``r2_teacher`` are the outcome variance explained by covariates at each level
+(see ``design.design_effect``); like ``icc`` they broadcast, so a table over
+effect sizes and R² values is still one call.
+"""
+import numpy as np
+
+from .assurance import expected_power, normal_prior, uniform_prior
+from .attrition import expected_power_with_attrition
+from .cache import memoize
+from .classsize import ClassSizeSummary
+from .cohorts import cohort_power
+from .design import design_effect as _design_effect
+from .design import (best_design_within_budget, comparison_teachers, minimum_detectable_effect, required_fellows,
+                     teacher_power, teacher_power_auto)
+from .lookup import default_table
+from .multiplicity import multiple_outcome_power
+from .simulate import simulate_power
+
+
+def _class_size_inputs(students_per_teacher, class_sizes):
+    # (mean class size, coefficient of variation) for the design effect
+    if class_sizes is None:
+        return students_per_teacher, 0.0
+    if not isinstance(class_sizes, ClassSizeSummary):
+        class_sizes = ClassSizeSummary.from_sizes(class_sizes)
+    class_sizes.require_classes()
+    return class_sizes.mean, class_sizes.cv
+
+
+def design_effect(students_per_teacher=22, use_clustering=False, icc=0, class_sizes=None, r2_student=0, r2_teacher=0):
+    students_per_teacher, cv = _class_size_inputs(students_per_teacher, class_sizes)
+    return float(_design_effect(students_per_teacher, icc if use_clustering else 0, cv, r2_student, r2_teacher))
+
+
+def _tabulated(class_sizes, ratio, r2_student, r2_teacher):
+    # The precomputed tables assume fixed class sizes, equal groups and no
+    # covariates
+    return (class_sizes is None and np.all(np.asarray(ratio) == 1)
+            and not np.any(np.asarray(r2_student) != 0) and not np.any(np.asarray(r2_teacher) != 0))
+
+
+@memoize
+def calculate_power(n_teachers, outcome_share, effect_size, students_per_teacher=22, use_clustering=False, icc=0,
+                    class_sizes=None, ratio=1, r2_student=0, r2_teacher=0):
+    icc = icc if use_clustering else 0
+    # Slider inputs land on the precomputed grid; anything else is computed
+    table = default_table() if _tabulated(class_sizes, ratio, r2_student, r2_teacher) else None
+    if table is not None:
+        power = table.power(n_teachers, outcome_share, effect_size, students_per_teacher, icc=icc)
+        if power is not None:
+            return power
+    students_per_teacher, cv = _class_size_inputs(students_per_teacher, class_sizes)
+    # Vectorized over every argument, so a whole table is one call
+    return teacher_power(n_teachers, outcome_share, effect_size, students_per_teacher, icc=icc, class_size_cv=cv,
+                         ratio=ratio, r2_student=r2_student, r2_teacher=r2_teacher)
+
+
+@memoize
+def calculate_power_auto(n_teachers, outcome_share, effect_size, students_per_teacher=22, use_clustering=False, icc=0,
+                         class_sizes=None, ratio=1, tol=1e-4, r2_student=0, r2_teacher=0):
+    # Like calculate_power, but large designs use the normal approximation
+    # and the result records which engine ran and its error bound
+    students_per_teacher, cv = _class_size_inputs(students_per_teacher, class_sizes)
+    return teacher_power_auto(n_teachers, outcome_share, effect_size, students_per_teacher,
+                              icc=icc if use_clustering else 0, class_size_cv=cv, ratio=ratio, tol=tol,
+                              r2_student=r2_student, r2_teacher=r2_teacher)
+
+
+@memoize
+def calculate_expected_power(n_teachers, outcome_share, effect_size, students_per_teacher=22, icc_low=0.05,
+                             icc_high=0.25, effect_size_sd=0, class_sizes=None, ratio=1, r2_student=0, r2_teacher=0):
+    # Power averaged over ICCs spread evenly between icc_low and icc_high and,
+    # when effect_size_sd > 0, over a normal effect size centred on effect_size
+    students_per_teacher, cv = _class_size_inputs(students_per_teacher, class_sizes)
+    icc = uniform_prior(icc_low, icc_high) if icc_high > icc_low else icc_low
+    if effect_size_sd > 0:
+        effect_size = normal_prior(effect_size, effect_size_sd)
+    return expected_power(n_teachers, outcome_share, effect_size, icc, students_per_teacher, class_size_cv=cv,
+                          ratio=ratio, r2_student=r2_student, r2_teacher=r2_teacher)
+
+
+@memoize
+def calculate_power_with_attrition(n_teachers, outcome_share, effect_size, teacher_attrition=0, student_attrition=0,
+                                   outcome_share_sd=0, students_per_teacher=22, use_clustering=False, icc=0,
+                                   class_sizes=None, ratio=1, r2_student=0, r2_teacher=0):
+    # Expected power over the teachers and students still in the study at the
+    # end, and over the share of fellows linked to outcomes when it is uncertain
+    students_per_teacher, cv = _class_size_inputs(students_per_teacher, class_sizes)
+    return expected_power_with_attrition(n_teachers, outcome_share, effect_size, teacher_attrition, student_attrition,
+                                         students_per_teacher, icc=icc if use_clustering else 0, class_size_cv=cv,
+                                         ratio=ratio, outcome_share_sd=outcome_share_sd, r2_student=r2_student,
+                                         r2_teacher=r2_teacher)
+
+
+@memoize
+def calculate_sample_size(effect_size, outcome_share, students_per_teacher=22, use_clustering=False, icc=0,
+                          class_sizes=None, ratio=1, r2_student=0, r2_teacher=0):
+    icc = icc if use_clustering else 0
+    table = default_table() if _tabulated(class_sizes, ratio, r2_student, r2_teacher) else None
+    fellows = None
+    if table is not None:
+        fellows = table.required_fellows(effect_size, outcome_share, students_per_teacher, icc=icc)
+    if fellows is None:
+        students_per_teacher, cv = _class_size_inputs(students_per_teacher, class_sizes)
+        fellows = required_fellows(effect_size, outcome_share, students_per_teacher, icc=icc,
+                                   class_size_cv=cv, ratio=ratio, r2_student=r2_student, r2_teacher=r2_teacher)
+    # Fellows plus their comparison teachers, which for equal sized groups
+    # doubles the fellows
+    total_teachers = fellows + comparison_teachers(fellows, ratio)
+    # No number of teachers is enough when none are linked to outcomes: None
+    # for a single design, nan in an array
+    if np.ndim(total_teachers) == 0:
+        return int(total_teachers) if np.isfinite(total_teachers) else None
+    return np.where(np.isfinite(total_teachers), total_teachers, np.nan)
+
+
+@memoize
+def calculate_mdes(n_teachers, outcome_share, students_per_teacher=22, use_clustering=False, icc=0, power=0.8,
+                   class_sizes=None, ratio=1, r2_student=0, r2_teacher=0):
+    students_per_teacher, cv = _class_size_inputs(students_per_teacher, class_sizes)
+    return minimum_detectable_effect(n_teachers, outcome_share, students_per_teacher,
+                                     icc=icc if use_clustering else 0, power=power, class_size_cv=cv, ratio=ratio,
+                                     r2_student=r2_student, r2_teacher=r2_teacher)
+
+
+@memoize
+def calculate_mdes_curve(outcome_share, students_per_teacher=22, use_clustering=False, icc=0, power=0.8,
+                         class_sizes=None, ratio=1, max_fellows=1000, r2_student=0, r2_teacher=0):
+    # Every fellows count from 1 to max_fellows in one vectorized solve
+    fellows = np.arange(1, max_fellows + 1)
+    students_per_teacher, cv = _class_size_inputs(students_per_teacher, class_sizes)
+    mdes = minimum_detectable_effect(fellows, outcome_share, students_per_teacher, icc=icc if use_clustering else 0,
+                                     power=power, class_size_cv=cv, ratio=ratio, r2_student=r2_student,
+                                     r2_teacher=r2_teacher)
+    return fellows, mdes
+
+
+@memoize
+def calculate_simulated_power(n_teachers, outcome_share, effect_size, students_per_teacher=22, use_clustering=False,
+                              icc=0, replicates=2000, analysis='cluster_mean', seed=0, r2_student=0, r2_teacher=0):
+    n_treatment = int(n_teachers * outcome_share)
+    icc = icc if use_clustering else 0
+    # Covariates shrink the residual variance at each level; the simulation
+    # draws outcomes with unit variance, so rescale the effect and ICC to
+    # the residual scale instead
+    between = icc * (1 - r2_teacher)
+    residual = between + (1 - icc) * (1 - r2_student)
+    return simulate_power(n_treatment, effect_size=np.asarray(effect_size) / np.sqrt(residual),
+                          students_per_teacher=students_per_teacher, icc=between / residual, replicates=replicates,
+                          analysis=analysis, seed=seed)
+
+
+@memoize
+def calculate_multiple_outcome_power(n_teachers, outcome_share, effect_size, outcomes=3, correlation=0.5,
+                                     students_per_teacher=22, use_clustering=False, icc=0, correction='holm',
+                                     class_sizes=None, ratio=1, r2_student=0, r2_teacher=0, replicates=10_000, seed=0):
+    # The same effect on each of `outcomes` outcomes, tested together with
+    # the given correction; see multiplicity.multiple_outcome_power
+    students_per_teacher, cv = _class_size_inputs(students_per_teacher, class_sizes)
+    effect_sizes = np.repeat(np.asarray(effect_size, dtype=float)[..., None], outcomes, axis=-1)
+    return multiple_outcome_power(n_teachers, outcome_share, effect_sizes, correlation, students_per_teacher,
+                                  icc=icc if use_clustering else 0, correction=correction, replicates=replicates,
+                                  seed=seed, class_size_cv=cv, ratio=ratio, r2_student=r2_student,
+                                  r2_teacher=r2_teacher)
+
+
+@memoize
+def calculate_budget_design(budget, cost_fellow, cost_comparison, effect_size, outcome_share=1, students_per_teacher=22,
+                            use_clustering=False, icc=0, class_sizes=None, cost_student=0, max_fellows=1000,
+                            r2_student=0, r2_teacher=0):
+    # Most powerful split of the budget between fellows and comparison
+    # teachers, trying up to max_fellows fellows; outcome_share and
+    # students_per_teacher may be candidate ranges
+    students_per_teacher, cv = _class_size_inputs(students_per_teacher, class_sizes)
+    return best_design_within_budget(budget, cost_fellow, cost_comparison, effect_size, outcome_share,
+                                     students_per_teacher, icc=icc if use_clustering else 0, class_size_cv=cv,
+                                     cost_student=cost_student, r2_student=r2_student, r2_teacher=r2_teacher,
+                                     max_fellows=max_fellows)
+
+
+@memoize
+def calculate_cohort_power(cohort_size, years, effect_size, outcome_share=1, students_per_teacher=22,
+                           use_clustering=False, icc=0, retention=1, year_icc=0, ratio=1, r2_student=0, r2_teacher=0):
+    # `cohort_size` fellows enter every year for `years` years; an array of
+    # cohort sizes gives one trajectory each. Class sizes are taken as equal.
+    cohorts = np.asarray(cohort_size, dtype=float)[..., None] * np.ones(years)
+    return cohort_power(cohorts, effect_size, outcome_share, students_per_teacher, icc=icc if use_clustering else 0,
+                        year_icc=year_icc if use_clustering else 0, retention=retention, ratio=ratio,
+                        r2_student=r2_student, r2_teacher=r2_teacher)
@@ -0,0 +1,155 @@
+"""Class-size distributions for the unequal-cluster design effect.
+
+Only the number of classes, the mean and the variance of class sizes enter
+the design effect, so a roster is reduced to those three numbers while it is
+read. Rosters are consumed in NumPy chunks and merged with the parallel
+variance update of Chan, Golub & LeVeque (1979); no per-teacher Python
+objects are created, so a statewide roster of ~100k teachers streams in
+constant memory.
+"""
+import csv
+import io
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+
+CHUNK_ROWS = 65_536
+
+
+@dataclass(frozen=True)
+class ClassSizeSummary:
+    """Count, mean and sum of squared deviations of a set of class sizes."""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    @property
+    def variance(self):
+        # Population variance: the roster is the full set of classes
+        return self.m2 / self.count if self.count else float('nan')
+
+    @property
+    def cv(self):
+        """Coefficient of variation of class sizes."""
+        return float(np.sqrt(self.variance) / self.mean) if self.count else float('nan')
+
+    def update(self, sizes, weights=None):
+        """Summary of this one merged with ``sizes`` (optionally with counts ``weights``).
+
+        Class sizes must be positive and finite, and counts non-negative and
+        finite; anything else raises ``ValueError``.
+        """
+        sizes = np.asarray(sizes, dtype=float).ravel()
+        weights = np.ones_like(sizes) if weights is None else np.asarray(weights, dtype=float).ravel()
+        valid = np.isfinite(sizes) & (sizes > 0)
+        if not valid.all():
+            raise ValueError(f'class sizes must be positive and finite, got {sizes[~valid][0]:g}')
+        valid = np.isfinite(weights) & (weights >= 0)
+        if not valid.all():
+            raise ValueError(f'class counts must be non-negative and finite, got {weights[~valid][0]:g}')
+        count = weights.sum()
+        if count == 0:
+            return self
+        mean = (weights * sizes).sum() / count
+        m2 = (weights * (sizes - mean) ** 2).sum()
+        total = self.count + count
+        delta = mean - self.mean
+        return ClassSizeSummary(
+            count=int(total),
+            mean=float(self.mean + delta * count / total),
+            m2=float(self.m2 + m2 + delta ** 2 * self.count * count / total),
+        )
+
+    def require_classes(self):
+        """This summary, or ``ValueError`` if it holds no classes."""
+        if not self.count:
+            raise ValueError('class sizes are empty')
+        return self
+
+    @classmethod
+    def from_sizes(cls, sizes):
+        """Summarize a non-empty array of class sizes, or an iterable of array chunks."""
+        if isinstance(sizes, np.ndarray) or np.isscalar(sizes):
+            return cls().update(sizes).require_classes()
+        summary = cls()
+        for chunk in _chunks(sizes):
+            summary = summary.update(chunk)
+        return summary.require_classes()
+
+    @classmethod
+    def from_distribution(cls, sizes, counts):
+        """Summarize a frequency table: ``counts[i]`` classes of ``sizes[i]`` students."""
+        return cls().update(sizes, counts).require_classes()
+
+
+def _chunks(values):
+    # Group a flat iterable of numbers into arrays; arrays pass through
+    iterator = iter(values)
+    while True:
+        head = next(iterator, None)
+        if head is None:
+            return
+        if np.ndim(head) > 0:
+            yield np.asarray(head, dtype=float)
+            continue
+        yield np.fromiter(itertools.chain([head], itertools.islice(iterator, CHUNK_ROWS - 1)), dtype=float)
+
+
+def _is_number(text):
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def read_class_sizes(source, column=None, chunk_rows=CHUNK_ROWS):
+    """Stream a roster into a ``ClassSizeSummary``.
+
+    ``source`` is a path or an open text or binary file in CSV form. A first
+    row that is not numeric is taken as a header, and ``column`` names the
+    class-size column (it may be omitted for single-column files); without a
+    header the class sizes are read from the first column. Blank lines are
+    skipped. A roster with no class sizes, a row without the class-size
+    column, or a size that is not a positive finite number raises
+    ``ValueError``.
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        with open(source, newline='') as f:
+            return read_class_sizes(f, column, chunk_rows)
+    if isinstance(source, io.BufferedIOBase) or 'b' in getattr(source, 'mode', ''):
+        text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        try:
+            return read_class_sizes(text, column, chunk_rows)
+        finally:
+            # Leave the caller's binary file open
+            text.detach()
+
+    rows = csv.reader(line for line in source if line.strip())
+    first = next(rows, None)
+    if first is None:
+        raise ValueError('roster is empty')
+    index = 0
+    if _is_number(first[0]):
+        rows = itertools.chain([first], rows)
+    elif column is not None and column in first:
+        index = first.index(column)
+    elif column is not None:
+        raise ValueError(f'roster has no column {column!r}; columns are {first}')
+    elif len(first) > 1:
+        raise ValueError(f'roster has several columns {first}; name the class-size column')
+
+    summary = ClassSizeSummary()
+    while True:
+        batch = list(itertools.islice(rows, chunk_rows))
+        if not batch:
+            if summary.count == 0:
+                raise ValueError('roster has a header but no class sizes')
+            return summary
+        try:
+            sizes = np.asarray([row[index] for row in batch], dtype=float)
+        except IndexError:
+            short = next(row for row in batch if len(row) <= index)
+            raise ValueError(f'roster row {short} has no class-size column') from None
+        summary = summary.update(sizes)
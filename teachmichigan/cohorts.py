@@ -0,0 +1,99 @@
+"""Power for pooled analyses as cohorts of fellows accumulate over program years.
+
+Each year a new cohort of fellows enters with ``ratio`` comparison teachers
+per fellow (``design.comparison_teachers``), and every teacher still in the
+study who is linked to student outcomes is observed with a new class of
+students. The analysis at the end of each year pools every year observed so
+far. A teacher observed for ``y`` years contributes a mean outcome with
+variance (outcome variance 1)
+
+    v(y) = icc (1 - r2_teacher) + year_icc / y + (1 - icc - year_icc) (1 - r2_student) / (m y)
+
+where ``year_icc`` is the share of variance between a teacher's classes in
+different years. Weighting teachers by precision, the sufficient statistic
+for each group is the total precision ``W = sum 1 / v(y)``, which is the
+effective number of students of the single-year calculator (``m / deff``
+per teacher in the first year), so power is the same t-test with ``W`` in
+place of ``nobs1``.
+
+Year to year only the teachers' years of observation change, so the state
+carried forward is the number of active teachers by years observed plus the
+frozen precision of teachers who have left. Each year updates it
+incrementally, for every trajectory at once.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from .design import comparison_teachers, linked_teachers
+from .engine import ttest_ind_power
+
+
+@dataclass(frozen=True)
+class CohortPower:
+    """Power at the end of each year, with the years on the last axis.
+
+    ``first_adequate_year`` is the first year (counting from 1) in which
+    power reaches the target, or infinity if it never does. ``fellows`` and
+    ``comparison_teachers`` are the linked teachers observed in each year.
+    """
+    power: np.ndarray
+    first_adequate_year: np.ndarray
+    fellows: np.ndarray
+    comparison_teachers: np.ndarray
+
+
+def _observation_variance(years, students_per_teacher, icc, year_icc, r2_student, r2_teacher):
+    return (icc * (1 - r2_teacher) + year_icc / years
+            + (1 - icc - year_icc) * (1 - r2_student) / (students_per_teacher * years))
+
+
+def cohort_power(cohorts, effect_size, outcome_share=1.0, students_per_teacher=22, icc=0.0, year_icc=0.0,
+                 retention=1.0, ratio=1.0, alpha=0.05, target=0.8, r2_student=0.0, r2_teacher=0.0):
+    """Power at the end of each program year for the fellows entering in ``cohorts``.
+
+    ``cohorts`` holds the number of fellows entering each year on its last
+    axis; leading axes are independent recruitment trajectories. The other
+    arguments broadcast against the leading axes. ``retention`` is the share
+    of teachers in each group who stay from one year to the next; students
+    already observed stay in the analysis when their teacher leaves.
+    """
+    cohorts = np.asarray(cohorts, dtype=float)
+    years = cohorts.shape[-1]
+    args = [np.asarray(value, dtype=float) for value in
+            (effect_size, outcome_share, students_per_teacher, icc, year_icc, retention, ratio, alpha,
+             r2_student, r2_teacher)]
+    shape = np.broadcast_shapes(cohorts.shape[:-1], *(value.shape for value in args))
+    effect_size, outcome_share, m, icc, year_icc, retention, ratio, alpha, r2_student, r2_teacher = \
+        (np.broadcast_to(value, shape)[..., None] for value in args)
+
+    # Precision of one teacher observed for 1, 2, ... years
+    tenure = np.arange(1, years + 1)
+    precision = 1 / _observation_variance(tenure, m, icc, year_icc, r2_student, r2_teacher)
+    cohorts = np.broadcast_to(cohorts, shape + (years,))
+    entering = linked_teachers(np.stack([cohorts, comparison_teachers(cohorts, ratio)]), outcome_share)
+
+    # Active teachers by years observed (index 0 = one year) and the
+    # precision contributed by teachers who have left, for each group
+    active = np.zeros((2,) + shape + (years,))
+    frozen = np.zeros((2,) + shape)
+    power = np.empty(shape + (years,))
+    teachers = np.empty((2,) + shape + (years,))
+    for year in range(years):
+        # Everyone active gains a year of observation, and the new cohort its first
+        active = np.roll(active, 1, axis=-1)
+        active[..., 0] = entering[..., year]
+        total = frozen + (active * precision).sum(axis=-1)
+        teachers[..., year] = active.sum(axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            year_power = ttest_ind_power(effect_size[..., 0], total[0], alpha=alpha[..., 0],
+                                         ratio=total[1] / total[0])
+        power[..., year] = np.where(np.isfinite(year_power), year_power, 0.0)
+        # Leavers keep the precision of the years they were observed
+        leaving = active * (1 - retention)
+        frozen = frozen + (leaving * precision).sum(axis=-1)
+        active = active - leaving
+
+    adequate = power >= target
+    first = np.where(adequate.any(axis=-1), adequate.argmax(axis=-1) + 1.0, np.inf)
+    return CohortPower(power, first, teachers[0], teachers[1])
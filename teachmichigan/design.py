@@ -0,0 +1,320 @@
+"""Teacher-level evaluation designs built on the vectorized power engine.
+
+Fellows are linked to student outcomes at the teacher level and compared with
+a comparison group of ``ratio`` teachers per fellow (equal-sized by default),
+of whom the same ``outcome_share`` is linked to student outcomes; see
+``comparison_teachers``. Students are clustered in classrooms, which is
+accounted for with the usual two-level design effect. When class sizes vary,
+``students_per_teacher`` is the mean class size and ``class_size_cv`` the
+coefficient of variation of class sizes (see ``classsize``).
+
+Pretest and other covariates enter through ``r2_student`` and ``r2_teacher``,
+the shares of the within-classroom and between-teacher outcome variance they
+explain. Both default to 0 (no covariates) and broadcast like everything else.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from .engine import bisect_integer, bracket, solve_effect_size, solve_nobs1, ttest_ind_power, ttest_ind_power_auto
+
+
+def design_effect(students_per_teacher=22, icc=0.0, class_size_cv=0.0, r2_student=0.0, r2_teacher=0.0):
+    """Two-level design effect ``1 + ((cv**2 + 1) * m - 1) * icc``.
+
+    With equal class sizes (``cv = 0``) this is the familiar
+    ``1 + (m - 1) * icc``; the ``cv`` term is the correction for unequal
+    cluster sizes of Eldridge, Ashby & Kerry (2006), with ``m`` the mean
+    class size.
+
+    Covariates scale the two variance components separately, giving
+    ``(cv**2 + 1) * m * icc * (1 - r2_teacher) + (1 - icc) * (1 - r2_student)``
+    (Bloom, Richburg-Hayes & Black, 2007). The degrees of freedom used by the
+    covariates are not subtracted.
+    """
+    m = np.asarray(students_per_teacher, dtype=float)
+    cv = np.asarray(class_size_cv, dtype=float)
+    icc = np.asarray(icc, dtype=float)
+    # Written as reductions of the unadjusted design effect so that without
+    # covariates the result is bit-for-bit the same as before
+    return (1 + ((cv ** 2 + 1) * m - 1) * icc - (cv ** 2 + 1) * m * icc * np.asarray(r2_teacher, dtype=float)
+            - (1 - icc) * np.asarray(r2_student, dtype=float))
+
+
+def linked_teachers(n_teachers, outcome_share):
+    """Number of fellows that can be linked to student outcomes."""
+    # Same truncation as int(n_teachers * outcome_share) in the app
+    return np.floor(np.asarray(n_teachers) * np.asarray(outcome_share))
+
+
+def comparison_teachers(n_teachers, ratio=1.0):
+    """Comparison teachers recruited alongside ``n_teachers`` fellows.
+
+    This is ``ratio`` teachers per fellow, rounded up. Comparison teachers
+    are drawn from the same kinds of positions as fellows, so
+    ``linked_teachers`` gives how many of them are linked to outcomes; see
+    ``linked_ratio`` for the ratio the power calculations use.
+    """
+    return np.ceil(np.asarray(ratio, dtype=float) * np.asarray(n_teachers) - 1e-9)
+
+
+def linked_ratio(n_teachers, outcome_share, ratio=1.0):
+    """Linked comparison teachers per linked fellow for ``n_teachers`` fellows.
+
+    Both groups are whole teachers: the comparison group is
+    ``comparison_teachers(n_teachers, ratio)`` and ``linked_teachers`` of
+    each group are linked to outcomes, so this is only approximately
+    ``ratio``. Every design in this package (cohorts, attrition and the
+    budget search included) uses this one rule. Where no fellow is linked
+    it is ``ratio`` itself.
+    """
+    linked = linked_teachers(n_teachers, outcome_share)
+    linked_comparison = linked_teachers(comparison_teachers(n_teachers, ratio), outcome_share)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(linked > 0, linked_comparison / linked, np.asarray(ratio, dtype=float))
+
+
+def teacher_power(n_teachers, outcome_share, effect_size, students_per_teacher=22, icc=0.0, alpha=0.05,
+                  class_size_cv=0.0, ratio=1.0, r2_student=0.0, r2_teacher=0.0):
+    """Power for the fellows design, broadcasting over every argument."""
+    n_treatment = linked_teachers(n_teachers, outcome_share)
+    nobs1 = n_treatment * students_per_teacher
+    deff = design_effect(students_per_teacher, icc, class_size_cv, r2_student, r2_teacher)
+    return ttest_ind_power(effect_size, nobs1, deff=deff, alpha=alpha,
+                           ratio=linked_ratio(n_teachers, outcome_share, ratio))
+
+
+def teacher_power_auto(n_teachers, outcome_share, effect_size, students_per_teacher=22, icc=0.0, alpha=0.05,
+                       class_size_cv=0.0, ratio=1.0, tol=1e-4, r2_student=0.0, r2_teacher=0.0):
+    """``teacher_power`` using the normal approximation where it is within ``tol``.
+
+    Returns an ``engine.PowerResult`` recording the engine and error bound.
+    """
+    n_treatment = linked_teachers(n_teachers, outcome_share)
+    nobs1 = n_treatment * students_per_teacher
+    deff = design_effect(students_per_teacher, icc, class_size_cv, r2_student, r2_teacher)
+    return ttest_ind_power_auto(effect_size, nobs1, deff=deff, alpha=alpha,
+                                ratio=linked_ratio(n_teachers, outcome_share, ratio), tol=tol)
+
+
+@dataclass
+class PowerSurface:
+    """Power evaluated over the outer product of the input ranges.
+
+    ``values`` has one axis per entry of ``dims``, in order, and ``coords``
+    maps each dimension name to the values along that axis.
+    """
+    dims: tuple
+    coords: dict
+    values: np.ndarray
+
+    def sel(self, **points):
+        """Slice the surface at exact coordinate values, e.g. ``sel(icc=0.2)``."""
+        index = []
+        for dim in self.dims:
+            if dim in points:
+                matches = np.flatnonzero(np.isclose(self.coords[dim], points[dim]))
+                if matches.size == 0:
+                    raise KeyError(f'{points[dim]!r} is not a coordinate of {dim!r}')
+                index.append(matches[0])
+            else:
+                index.append(slice(None))
+        dims = tuple(dim for dim in self.dims if dim not in points)
+        return PowerSurface(dims, {dim: self.coords[dim] for dim in dims}, self.values[tuple(index)])
+
+    def to_frame(self, name='power'):
+        """Long-format DataFrame with one column per dimension plus ``name``."""
+        import pandas as pd
+
+        grids = np.meshgrid(*(self.coords[dim] for dim in self.dims), indexing='ij')
+        columns = {dim: grid.ravel() for dim, grid in zip(self.dims, grids)}
+        columns[name] = self.values.ravel()
+        return pd.DataFrame(columns)
+
+
+def power_surface(n_teachers, outcome_share, effect_size, icc=0.0, students_per_teacher=22, alpha=0.05):
+    """Power over every combination of the given ranges in one broadcast call.
+
+    Each argument may be a scalar or a 1-D range; the result has a dimension
+    for every argument, in signature order (length one for scalars).
+    """
+    dims = ('n_teachers', 'outcome_share', 'effect_size', 'icc', 'students_per_teacher')
+    coords = dict(zip(dims, (np.atleast_1d(np.asarray(value, dtype=float))
+                             for value in (n_teachers, outcome_share, effect_size, icc, students_per_teacher))))
+    for dim, values in coords.items():
+        if values.ndim != 1:
+            raise ValueError(f'{dim} must be a scalar or a 1-D range')
+    axes = np.ix_(*coords.values())
+    values = teacher_power(axes[0], axes[1], axes[2], students_per_teacher=axes[4], icc=axes[3], alpha=alpha)
+    return PowerSurface(dims, coords, values)
+
+
+def required_fellows(effect_size, outcome_share, students_per_teacher=22, icc=0.0, power=0.8, alpha=0.05,
+                     class_size_cv=0.0, ratio=1.0, r2_student=0.0, r2_teacher=0.0):
+    """Fellows needed to reach ``power``, broadcasting over every argument.
+
+    The student-level sample size only depends on effect size, power, alpha
+    and ratio, so it is solved once per distinct combination of those and
+    then scaled by the design effect for every class size, ICC, R² and
+    outcome share. With equal groups power depends only on the number of
+    linked fellows, so that is exact once both counts are rounded up to
+    whole teachers. Other ratios round the comparison group separately
+    (see ``linked_ratio``), so there the estimate only seeds a bisection for
+    the smallest number of fellows whose ``teacher_power`` reaches
+    ``power``. The comparison group needs ``comparison_teachers`` more.
+    """
+    nobs1 = np.asarray(solve_nobs1(effect_size, power=power, alpha=alpha, ratio=ratio))
+    deff = design_effect(students_per_teacher, icc, class_size_cv, r2_student, r2_teacher)
+    share = np.asarray(outcome_share, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        linked = np.ceil(nobs1 * deff / np.asarray(students_per_teacher))
+        estimate = np.ceil(linked / share)
+        # estimate * share can land just below a whole number in floating point
+        estimate = np.where(linked_teachers(estimate, share) < linked, estimate + 1, estimate)
+    if np.all(np.asarray(ratio) == 1):
+        return estimate if estimate.ndim else estimate[()]
+
+    def shortfall(n_teachers):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return teacher_power(n_teachers, outcome_share, effect_size, students_per_teacher, icc, alpha,
+                                 class_size_cv, ratio, r2_student, r2_teacher) - power
+
+    # No finite design (no share linked, zero effect) keeps the estimate
+    solvable = np.isfinite(estimate)
+    lo = np.zeros(estimate.shape)
+    hi = bracket(shortfall, lo, np.where(solvable, np.maximum(estimate, 1), 1))
+    solvable &= np.isfinite(hi)
+    fellows = bisect_integer(shortfall, lo, np.where(solvable, hi, 1))
+    fellows = np.where(solvable, fellows, np.where(np.isfinite(estimate), np.nan, estimate))
+    return fellows if fellows.ndim else fellows[()]
+
+
+def minimum_detectable_effect(n_teachers, outcome_share, students_per_teacher=22, icc=0.0, power=0.8, alpha=0.05,
+                              class_size_cv=0.0, ratio=1.0, r2_student=0.0, r2_teacher=0.0):
+    """Smallest effect size detectable with ``power``, broadcasting over every argument."""
+    nobs1 = linked_teachers(n_teachers, outcome_share) * students_per_teacher
+    deff = design_effect(students_per_teacher, icc, class_size_cv, r2_student, r2_teacher)
+    return solve_effect_size(nobs1, deff=deff, power=power, alpha=alpha,
+                             ratio=linked_ratio(n_teachers, outcome_share, ratio))
+
+
+@dataclass
+class Allocation:
+    """Cheapest design found by ``optimal_allocation``, one entry per scenario.
+
+    ``comparison_teachers`` is ``ratio`` times the number of fellows,
+    rounded up (see ``comparison_teachers``).
+    """
+    ratio: np.ndarray
+    fellows: np.ndarray
+    comparison_teachers: np.ndarray
+    cost: np.ndarray
+
+
+def optimal_allocation(effect_size, outcome_share, cost_fellow, cost_comparison, students_per_teacher=22, icc=0.0,
+                       power=0.8, alpha=0.05, class_size_cv=0.0, ratios=None, r2_student=0.0, r2_teacher=0.0):
+    """Comparison teachers per fellow that reach ``power`` at the lowest cost.
+
+    Every candidate ratio is evaluated for every scenario in one broadcast
+    call on a trailing axis. The default candidates run from 0.25 to 10 in
+    steps of 0.05 and include the large-sample optimum
+    ``sqrt(cost_fellow / cost_comparison)`` whenever comparison teachers cost
+    anything, so the grid only has to capture the small-sample and
+    whole-teacher rounding effects. Fellows are ``required_fellows`` at each
+    ratio, so the chosen design reaches ``power`` with whole teachers.
+    """
+    args = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in
+                                 (effect_size, outcome_share, cost_fellow, cost_comparison,
+                                  students_per_teacher, icc, power, alpha, class_size_cv, r2_student, r2_teacher)))
+    (effect_size, outcome_share, cost_fellow, cost_comparison, students_per_teacher, icc, power, alpha, cv,
+     r2_student, r2_teacher) = args
+    if ratios is None:
+        candidates = np.arange(0.25, 10.0001, 0.05)
+        grid = np.broadcast_to(candidates, effect_size.shape + candidates.shape)
+        # Free comparison teachers have no large-sample optimum; the grid alone decides
+        with np.errstate(divide='ignore'):
+            analytic = np.sqrt(cost_fellow / np.where(cost_comparison > 0, cost_comparison, np.nan))[..., None]
+        ratios = np.concatenate([grid, analytic], axis=-1)
+    else:
+        ratios = np.broadcast_to(np.asarray(ratios, dtype=float), effect_size.shape + np.shape(ratios)[-1:])
+
+    def expand(values):
+        return values[..., None]
+
+    fellows = required_fellows(expand(effect_size), expand(outcome_share), expand(students_per_teacher),
+                               expand(icc), expand(power), expand(alpha), expand(cv), ratios,
+                               expand(r2_student), expand(r2_teacher))
+    with np.errstate(invalid='ignore'):
+        comparison = comparison_teachers(fellows, ratios)
+        cost = expand(cost_fellow) * fellows + expand(cost_comparison) * comparison
+    best = np.expand_dims(np.nanargmin(np.where(np.isfinite(cost), cost, np.inf), axis=-1), -1)
+
+    def pick(values):
+        values = np.take_along_axis(values, best, axis=-1)[..., 0]
+        return values if values.ndim else values[()]
+
+    return Allocation(pick(ratios), pick(fellows), pick(comparison), pick(cost))
+
+
+@dataclass
+class BudgetDesign:
+    """Most powerful design found by ``best_design_within_budget``.
+
+    ``surface`` holds the best power reachable for every candidate outcome
+    share, class size and number of fellows, with the rest of the budget
+    spent on comparison teachers.
+    """
+    fellows: int
+    comparison_teachers: int
+    outcome_share: float
+    students_per_teacher: float
+    power: float
+    cost: float
+    surface: PowerSurface
+
+
+def best_design_within_budget(budget, cost_fellow, cost_comparison, effect_size, outcome_share=1.0,
+                              students_per_teacher=22, icc=0.0, alpha=0.05, class_size_cv=0.0, cost_student=0.0,
+                              r2_student=0.0, r2_teacher=0.0, max_fellows=1000):
+    """Fellows, comparison teachers, outcome share and class size with the highest power for ``budget``.
+
+    ``outcome_share`` and ``students_per_teacher`` may be 1-D ranges of
+    candidates. Every number of fellows the budget allows, up to
+    ``max_fellows``, is tried, and the rest of the budget buys comparison
+    teachers, with the same share of them linked to student outcomes.
+    ``cost_student`` is an optional cost per student in the analysis (data
+    collection, say). All candidates are evaluated in one broadcast call;
+    among designs with the same power the cheapest wins.
+    """
+    shares = np.atleast_1d(np.asarray(outcome_share, dtype=float))
+    sizes = np.atleast_1d(np.asarray(students_per_teacher, dtype=float))
+    fellows = np.arange(1, min(max_fellows, int(budget // cost_fellow)) + 1, dtype=float)
+    share, m, f = shares[:, None, None], sizes[None, :, None], fellows[None, None, :]
+
+    linked = linked_teachers(f, share)
+    remaining = budget - f * cost_fellow - linked * m * cost_student
+    # Charging every comparison teacher the expected student cost keeps the
+    # design within budget, since at most that share of them is linked
+    comparison = np.floor(remaining / (cost_comparison + share * m * cost_student) + 1e-9)
+    linked_comparison = linked_teachers(comparison, share)
+    feasible = (linked >= 1) & (linked_comparison >= 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Comparison teachers per fellow, which teacher_power links the same way
+        ratio = np.where(feasible, comparison / f, 1.0)
+        power = teacher_power(f, share, effect_size, m, icc=icc, alpha=alpha, class_size_cv=class_size_cv,
+                              ratio=ratio, r2_student=r2_student, r2_teacher=r2_teacher)
+    power = np.where(feasible, power, np.nan)
+    comparison = np.where(feasible, comparison, 0)
+    linked_comparison = np.where(feasible, linked_comparison, 0)
+    cost = f * cost_fellow + comparison * cost_comparison + (linked + linked_comparison) * m * cost_student
+
+    surface = PowerSurface(('outcome_share', 'students_per_teacher', 'fellows'),
+                           {'outcome_share': shares, 'students_per_teacher': sizes, 'fellows': fellows}, power)
+    if not feasible.any():
+        raise ValueError('the budget does not cover one fellow and one comparison teacher linked to outcomes')
+    best_power = np.nanmax(power)
+    # Power ties (to rounding) go to the cheapest design
+    candidates = np.where(power >= best_power - 1e-12, cost, np.inf)
+    i, j, k = np.unravel_index(np.argmin(candidates), power.shape)
+    return BudgetDesign(int(fellows[k]), int(comparison[i, j, k]), float(shares[i]), float(sizes[j]),
+                        float(power[i, j, k]), float(cost[i, j, k]), surface)
@@ -0,0 +1,297 @@
+"""Vectorized noncentral-t power engine.
+
+Every function accepts NumPy arrays (or scalars) and broadcasts them against
+each other, so a whole table of scenarios is evaluated in a single call. The
+formulas are the ones used by ``statsmodels.stats.power.TTestIndPower``, and
+the results agree with it to floating point precision. SciPy is imported on
+first use so that importing the package stays cheap.
+"""
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+
+from .instrument import count
+
+ALTERNATIVES = ('two-sided', 'larger', 'smaller')
+
+
+def as_result(values):
+    """Plain float for a scalar result, the array otherwise.
+
+    Callers that used to receive the statsmodels result keep working
+    unchanged.
+    """
+    values = np.asarray(values, dtype=float)
+    return float(values) if values.ndim == 0 else values
+
+
+def _nct_cdf(df, nc, x):
+    # scipy's nctdtr returns nan instead of underflowing to zero deep in the
+    # lower tail (x far below nc), which happens for large fellows counts.
+    from scipy import special
+
+    cdf = special.nctdtr(df, nc, x)
+    underflow = np.isnan(cdf) & np.isfinite(df) & np.isfinite(nc) & (x < nc)
+    return np.where(underflow, 0.0, cdf)
+
+
+def nct_power(nc, df, alpha=0.05, alternative='two-sided'):
+    """Power of a t-test with noncentrality ``nc`` and ``df`` degrees of freedom."""
+    from scipy import special
+
+    if alternative not in ALTERNATIVES:
+        raise ValueError(f"alternative must be one of {ALTERNATIVES}, got {alternative!r}")
+    count('power_evaluations')
+    nc = np.asarray(nc, dtype=float)
+    df = np.asarray(df, dtype=float)
+    alpha = np.asarray(alpha, dtype=float)
+    alpha_ = alpha / 2 if alternative == 'two-sided' else alpha
+
+    power = np.zeros(np.broadcast_shapes(nc.shape, df.shape, alpha.shape))
+    if alternative in ('two-sided', 'larger'):
+        crit_upp = -special.stdtrit(df, alpha_)
+        power = power + (1 - _nct_cdf(df, nc, crit_upp))
+    if alternative in ('two-sided', 'smaller'):
+        crit_low = special.stdtrit(df, alpha_)
+        power = power + _nct_cdf(df, nc, crit_low)
+    return as_result(power)
+
+
+def normal_power(nc, alpha=0.05, alternative='two-sided'):
+    """Power of a z-test with noncentrality ``nc``: the large-df limit of ``nct_power``."""
+    from scipy import special
+
+    if alternative not in ALTERNATIVES:
+        raise ValueError(f"alternative must be one of {ALTERNATIVES}, got {alternative!r}")
+    nc = np.asarray(nc, dtype=float)
+    alpha = np.asarray(alpha, dtype=float)
+    crit = special.ndtri(1 - (alpha / 2 if alternative == 'two-sided' else alpha))
+    power = np.zeros(np.broadcast_shapes(nc.shape, alpha.shape))
+    if alternative in ('two-sided', 'larger'):
+        power = power + special.ndtr(nc - crit)
+    if alternative in ('two-sided', 'smaller'):
+        power = power + special.ndtr(-nc - crit)
+    return as_result(power)
+
+
+# Noncentralities over which the normal approximation error is maximized.
+# Beyond 12 both powers are 1 to double precision.
+_ERROR_GRID = np.arange(0, 12.0001, 0.005)
+
+
+def normal_error(df, alpha=0.05, alternative='two-sided'):
+    """Largest absolute power error of ``normal_power`` against ``nct_power`` at ``df``.
+
+    The maximum is taken over a fine grid of noncentralities; for alpha =
+    0.05 it is close to ``0.83 / df`` and decreases with ``df``.
+    """
+    nc = -_ERROR_GRID if alternative == 'smaller' else _ERROR_GRID
+    exact = nct_power(nc, float(df), alpha=alpha, alternative=alternative)
+    return float(np.max(np.abs(exact - normal_power(nc, alpha=alpha, alternative=alternative))))
+
+
+@functools.lru_cache(maxsize=None)
+def normal_df_threshold(tol=1e-4, alpha=0.05, alternative='two-sided'):
+    """Smallest whole df at which the normal approximation error is at most ``tol``."""
+    lo, hi = 1.0, 2.0
+    while normal_error(hi, alpha, alternative) > tol:
+        lo, hi = hi, hi * 2
+    while hi - lo > 1:
+        mid = np.floor((lo + hi) / 2)
+        if normal_error(mid, alpha, alternative) > tol:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+
+@functools.lru_cache(maxsize=None)
+def _threshold_error(tol, alpha, alternative):
+    return normal_error(normal_df_threshold(tol, alpha, alternative), alpha, alternative)
+
+
+@dataclass(frozen=True)
+class PowerResult:
+    """Power together with how it was computed.
+
+    ``engine`` is ``'normal'``, ``'nct'`` or ``'mixed'`` (some elements each),
+    and ``error_bound`` the largest possible absolute error from the
+    approximation (zero when every element used the exact noncentral t).
+    """
+    power: np.ndarray
+    engine: str
+    error_bound: float
+    df_threshold: float
+
+
+def select_power(nc, df, alpha=0.05, alternative='two-sided', tol=1e-4):
+    """Power using the normal approximation wherever it is within ``tol`` of exact.
+
+    Elements whose degrees of freedom reach ``normal_df_threshold(tol)`` use
+    the closed-form normal power; the rest use the exact noncentral t. Only
+    scalar ``alpha`` is supported, since the threshold depends on it.
+    """
+    nc = np.asarray(nc, dtype=float)
+    df = np.asarray(df, dtype=float)
+    threshold = normal_df_threshold(tol, float(alpha), alternative)
+    use_normal = np.broadcast_to(df >= threshold, np.broadcast_shapes(nc.shape, df.shape))
+    power = np.empty(use_normal.shape)
+    nc_b, df_b = np.broadcast_to(nc, use_normal.shape), np.broadcast_to(df, use_normal.shape)
+    if use_normal.any():
+        power[use_normal] = normal_power(nc_b[use_normal], alpha=alpha, alternative=alternative)
+    if not use_normal.all():
+        power[~use_normal] = nct_power(nc_b[~use_normal], df_b[~use_normal], alpha=alpha, alternative=alternative)
+    if use_normal.all():
+        engine = 'normal'
+    elif use_normal.any():
+        engine = 'mixed'
+    else:
+        engine = 'nct'
+    bound = _threshold_error(tol, float(alpha), alternative) if use_normal.any() else 0.0
+    return PowerResult(as_result(power), engine, bound, threshold)
+
+
+def ttest_ind_nc_df(effect_size, nobs1, deff, ratio):
+    """Noncentrality and degrees of freedom of the two-sample t-test, vectorized."""
+    nobs1 = np.asarray(nobs1, dtype=float) / np.asarray(deff, dtype=float)
+    nobs2 = nobs1 * np.asarray(ratio, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df = nobs1 - 1 + nobs2 - 1
+        nobs = 1.0 / (1.0 / nobs1 + 1.0 / nobs2)
+        nc = np.asarray(effect_size, dtype=float) * np.sqrt(nobs)
+    return nc, df
+
+
+def ttest_ind_power_auto(effect_size, nobs1, deff=1.0, alpha=0.05, ratio=1.0, alternative='two-sided', tol=1e-4):
+    """``ttest_ind_power`` with automatic engine selection; returns a ``PowerResult``."""
+    nc, df = ttest_ind_nc_df(effect_size, nobs1, deff, ratio)
+    return select_power(nc, df, alpha=alpha, alternative=alternative, tol=tol)
+
+
+def ttest_ind_power(effect_size, nobs1, deff=1.0, alpha=0.05, ratio=1.0, alternative='two-sided'):
+    """Power of a two-sample t-test, vectorized over all arguments.
+
+    ``nobs1`` is the number of observations in the first group before the
+    design effect ``deff`` is applied; the second group has ``nobs1 * ratio``.
+    """
+    nc, df = ttest_ind_nc_df(effect_size, nobs1, deff, ratio)
+    return nct_power(nc, df, alpha=alpha, alternative=alternative)
+
+
+def _find_root(func, lo, hi, iterations=100, rtol=1e-14, ftol=1e-14):
+    # Vectorized Illinois (modified regula falsi) for an increasing func with
+    # func(lo) < 0 <= func(hi). Every element is narrowed in lockstep and
+    # stops once the bracket is narrow or func(hi) is within ftol of zero
+    # (power is only accurate to ~1e-15 anyway). The bracket is kept
+    # throughout, and a step that would leave it falls back to bisection.
+    lo, hi = np.broadcast_arrays(np.asarray(lo, dtype=float), np.asarray(hi, dtype=float))
+    lo, hi = lo.copy(), hi.copy()
+    flo, fhi = np.asarray(func(lo), dtype=float), np.asarray(func(hi), dtype=float)
+    side = np.zeros(lo.shape, dtype=int)
+    for _ in range(iterations):
+        active = ((hi - lo) > rtol * np.abs(hi)) & (fhi > ftol) & np.isfinite(flo)
+        if not active.any():
+            break
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = hi - fhi * (hi - lo) / (fhi - flo)
+        x = np.where(np.isfinite(x) & (x > lo) & (x < hi), x, (lo + hi) / 2)
+        x = np.where(active, x, hi)
+        fx = np.asarray(func(x), dtype=float)
+        to_hi = active & (fx >= 0)
+        to_lo = active & ~(fx >= 0)
+        # Illinois step: halve the stale end's value when the same end moves twice
+        flo = np.where(to_hi & (side == 1), flo / 2, flo)
+        fhi = np.where(to_lo & (side == -1), fhi / 2, fhi)
+        hi, fhi = np.where(to_hi, x, hi), np.where(to_hi, fx, fhi)
+        lo, flo = np.where(to_lo, x, lo), np.where(to_lo, fx, flo)
+        side = np.where(to_hi, 1, np.where(to_lo, -1, side))
+    return hi
+
+
+def bisect_integer(func, lo, hi):
+    """Smallest integer in ``(lo, hi]`` with ``func >= 0``, for ``func(lo) < 0 <= func(hi)``, vectorized."""
+    lo, hi = np.broadcast_arrays(np.asarray(lo, dtype=float), np.asarray(hi, dtype=float))
+    lo, hi = lo.copy(), hi.copy()
+    while True:
+        active = (hi - lo) > 1
+        if not active.any():
+            return hi
+        mid = np.where(active, np.floor((lo + hi) / 2), hi)
+        above = func(mid) >= 0
+        hi = np.where(active & above, mid, hi)
+        lo = np.where(active & ~above, mid, lo)
+
+
+def bracket(func, lo, start, max_doublings=64):
+    """Upper ends with ``func(hi) >= 0``, found by doubling ``start``.
+
+    Elements that never get there (power unreachable, e.g. a zero effect
+    size) or where ``func`` is undefined come back as nan.
+    """
+    hi = np.broadcast_to(np.asarray(start, dtype=float), np.shape(lo)).copy()
+    value = np.asarray(func(hi), dtype=float)
+    for _ in range(max_doublings):
+        short = value < 0
+        if not short.any():
+            break
+        hi = np.where(short, hi * 2, hi)
+        value = np.where(short, func(hi), value)
+    return np.where(value >= 0, hi, np.nan)
+
+
+def solve_nobs1(effect_size, power=0.8, alpha=0.05, ratio=1.0, alternative='two-sided'):
+    """Observations in the first group needed to reach ``power``, vectorized.
+
+    The batched counterpart of ``statsmodels.stats.power.tt_ind_solve_power``
+    with ``nobs1`` unknown: all scenarios share one bracketing and bisection
+    pass instead of one scalar root find each.
+    """
+    count('solves')
+    effect_size, power, alpha, ratio = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (effect_size, power, alpha, ratio)))
+
+    def shortfall(nobs1):
+        return ttest_ind_power(effect_size, nobs1, alpha=alpha, ratio=ratio, alternative=alternative) - power
+
+    lo = np.full(effect_size.shape, 2.0)
+    hi = bracket(shortfall, lo, 50.0)
+    solvable = np.isfinite(hi)
+    nobs1 = _find_root(shortfall, lo, np.where(solvable, hi, lo + 1))
+    # Designs that already reach the target power at the smallest sample
+    nobs1 = np.where(shortfall(lo) >= 0, lo, nobs1)
+    return as_result(np.where(solvable, nobs1, np.nan))
+
+
+def solve_nc(df, power=0.8, alpha=0.05, alternative='two-sided'):
+    """Noncentrality (in magnitude) at which a t-test with ``df`` degrees of freedom reaches ``power``."""
+    count('solves')
+    df, power, alpha = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (df, power, alpha)))
+
+    def shortfall(nc):
+        sign = -1 if alternative == 'smaller' else 1
+        return np.asarray(nct_power(sign * nc, df, alpha=alpha, alternative=alternative)) - power
+
+    lo = np.zeros(df.shape)
+    hi = bracket(shortfall, lo, 4.0)
+    solvable = np.isfinite(hi)
+    nc = _find_root(shortfall, lo, np.where(solvable, hi, 1.0))
+    return as_result(np.where(solvable, nc, np.nan))
+
+
+def solve_effect_size(nobs1, deff=1.0, power=0.8, alpha=0.05, ratio=1.0, alternative='two-sided'):
+    """Minimum detectable standardized effect for a two-sample t-test, vectorized.
+
+    Degrees of freedom do not depend on the effect size, so this is a single
+    solve for the noncentrality scaled back to the effect-size metric.
+    """
+    nobs1 = np.asarray(nobs1, dtype=float) / np.asarray(deff, dtype=float)
+    nobs2 = nobs1 * np.asarray(ratio, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df = nobs1 - 1 + nobs2 - 1
+        nobs = 1.0 / (1.0 / nobs1 + 1.0 / nobs2)
+        df = np.where(df > 0, df, np.nan)
+        effect_size = np.asarray(solve_nc(df, power=power, alpha=alpha, alternative=alternative)) / np.sqrt(nobs)
+    if alternative == 'smaller':
+        effect_size = -effect_size
+    return as_result(effect_size)
@@ -0,0 +1,89 @@
+"""Opt-in timing and counters for one run of the app.
+
+Enabled with ``?debug=1`` in the app URL or ``TEACHMICHIGAN_DEBUG=1`` in the
+environment. A ``Rerun`` times named stages (imports, formatting, rendering;
+``Pipeline`` times its own stages) and, at the end, reports how many power
+evaluations and root finds ran and how often the result cache and the
+session's pipeline were hit. The report is shown at the end of the
+calculator and written as a single JSON log line on the
+``teachmichigan.instrument`` logger.
+
+The engine and the cache report their work with ``count``, which adds to the
+``Rerun`` active in the current context. Streamlit runs each session's script
+in its own thread, so every rerun counts only its own work even while other
+sessions are computing.
+"""
+import contextvars
+import json
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = 'TEACHMICHIGAN_DEBUG'
+_TRUE = ('1', 'true', 'yes', 'on')
+
+# Counters of the rerun in progress in this context, if any
+_active = contextvars.ContextVar('teachmichigan_rerun_counts', default=None)
+
+
+def enabled(query_params=None):
+    """Whether instrumentation was requested by the environment or the URL."""
+    if os.environ.get(ENV_VAR, '').lower() in _TRUE:
+        return True
+    return query_params is not None and str(query_params.get('debug', '')).lower() in _TRUE
+
+
+def configure_logging(level=logging.INFO):
+    """Send this module's log lines to stderr unless logging is already set up."""
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(level)
+
+
+def count(name):
+    """Add one to counter ``name`` of the rerun in progress, if there is one."""
+    counts = _active.get()
+    if counts is not None:
+        counts[name] += 1
+
+
+class Rerun:
+    """Stage timings and counter deltas for one run of the script or fragment."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.counts = Counter()
+        # Replaces the previous rerun's counters in this context
+        _active.set(self.counts)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as ``name``; repeated names accumulate."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def summary(self, pipeline=None):
+        """JSON-serializable report of the run so far."""
+        report = {
+            'total_seconds': time.perf_counter() - self.started,
+            'stages': dict(self.timings),
+            'counts': dict(self.counts),
+        }
+        if pipeline is not None:
+            report['stages'].update(pipeline.timings)
+            report['pipeline'] = {'hits': pipeline.hits, 'misses': pipeline.misses,
+                                  'recomputed': list(pipeline.recomputed)}
+        return report
+
+    def log(self, report):
+        logger.info('rerun %s', json.dumps(report, sort_keys=True))
@@ -0,0 +1,135 @@
+"""Precomputed power and sample-size tables for the app's discrete slider grid.
+
+The sliders only produce a finite set of inputs, so both results can be
+computed ahead of time and looked up in O(1) during a rerun. Power only
+depends on the number of linked fellows ``floor(n_teachers * outcome_share)``,
+not on the two sliders separately, which keeps the tables small:
+
+* ``power.npy`` -- float64, indexed ``[icc, effect_size, linked fellows]``
+* ``required_fellows.npy`` -- int32 fellows per group, indexed
+  ``[icc, effect_size, outcome share]`` (-1 where the share is zero)
+
+Build them with ``python -m teachmichigan.lookup``; the files are memory
+mapped when read, so every server process shares one copy of the pages.
+"""
+import argparse
+import functools
+import os
+
+import numpy as np
+
+from .design import linked_teachers, required_fellows, teacher_power
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(__file__), 'data')
+
+# The grid mirrors the sliders in power_calculator.py
+EFFECT_SIZES = np.arange(0.03, 0.25, 0.03)
+ICCS = np.arange(51) / 100
+MAX_FELLOWS = 1000
+SHARE_STEPS = 100
+STUDENTS_PER_TEACHER = 22
+ALPHA = 0.05
+POWER = 0.8
+
+_TOLERANCE = 1e-9
+
+
+def _grid_index(values, step, size, offset=0):
+    # Index of each value on an evenly spaced grid, or None if any is off it
+    values = np.asarray(values, dtype=float)
+    index = np.rint(values / step).astype(int) - offset
+    if np.any(index < 0) or np.any(index >= size):
+        return None
+    if np.any(np.abs((index + offset) * step - values) > _TOLERANCE):
+        return None
+    return index
+
+
+class LookupTable:
+    """Read-only view of the precomputed tables."""
+
+    def __init__(self, power, required):
+        self.power_table = power
+        self.required_table = required
+
+    @classmethod
+    def load(cls, directory=DEFAULT_DIRECTORY):
+        power = np.load(os.path.join(directory, 'power.npy'), mmap_mode='r')
+        required = np.load(os.path.join(directory, 'required_fellows.npy'), mmap_mode='r')
+        if (power.shape != (len(ICCS), len(EFFECT_SIZES), MAX_FELLOWS + 1)
+                or required.shape != (len(ICCS), len(EFFECT_SIZES), SHARE_STEPS + 1)):
+            raise ValueError(f'lookup tables in {directory} do not match the slider grid; rebuild them')
+        return cls(power, required)
+
+    def _on_grid(self, students_per_teacher, alpha):
+        # The tables have a single class size and alpha; arrays of either are
+        # left to direct computation
+        return (np.ndim(students_per_teacher) == 0 and np.ndim(alpha) == 0
+                and students_per_teacher == STUDENTS_PER_TEACHER and alpha == ALPHA)
+
+    def power(self, n_teachers, outcome_share, effect_size, students_per_teacher=22, icc=0, alpha=0.05):
+        """Tabulated power, or None when any input falls off the grid."""
+        if not self._on_grid(students_per_teacher, alpha):
+            return None
+        fellows = _grid_index(n_teachers, 1, MAX_FELLOWS + 1)
+        share = _grid_index(outcome_share, 1 / SHARE_STEPS, SHARE_STEPS + 1)
+        effect = _grid_index(effect_size, 0.03, len(EFFECT_SIZES), offset=1)
+        icc_index = _grid_index(icc, 0.01, len(ICCS))
+        if fellows is None or share is None or effect is None or icc_index is None:
+            return None
+        linked = linked_teachers(n_teachers, outcome_share).astype(int)
+        values = self.power_table[icc_index, effect, linked]
+        return float(values) if np.ndim(values) == 0 else np.array(values)
+
+    def required_fellows(self, effect_size, outcome_share, students_per_teacher=22, icc=0, alpha=0.05, power=0.8):
+        """Tabulated fellows per group, or None when any input falls off the grid."""
+        if not self._on_grid(students_per_teacher, alpha) or np.ndim(power) or power != POWER:
+            return None
+        effect = _grid_index(effect_size, 0.03, len(EFFECT_SIZES), offset=1)
+        share = _grid_index(outcome_share, 1 / SHARE_STEPS, SHARE_STEPS + 1)
+        icc_index = _grid_index(icc, 0.01, len(ICCS))
+        if effect is None or share is None or icc_index is None or np.any(share == 0):
+            return None
+        values = self.required_table[icc_index, effect, share]
+        return int(values) if np.ndim(values) == 0 else np.array(values)
+
+
+@functools.lru_cache(maxsize=None)
+def default_table(directory=DEFAULT_DIRECTORY):
+    """The tables shipped next to the package, or None if they were not built."""
+    try:
+        return LookupTable.load(directory)
+    except (OSError, ValueError):
+        return None
+
+
+def build(directory=DEFAULT_DIRECTORY):
+    """Compute both tables for the full slider grid and write them to ``directory``."""
+    os.makedirs(directory, exist_ok=True)
+    linked = np.arange(MAX_FELLOWS + 1)
+    # One fellow with a 100% share is one linked fellow, so the power axis
+    # can be evaluated directly on the number of linked fellows.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        power = teacher_power(linked[None, None, :], 1.0, EFFECT_SIZES[None, :, None],
+                              STUDENTS_PER_TEACHER, icc=ICCS[:, None, None], alpha=ALPHA)
+    shares = np.arange(SHARE_STEPS + 1) / SHARE_STEPS
+    required = required_fellows(EFFECT_SIZES[None, :, None], shares[None, None, :], STUDENTS_PER_TEACHER,
+                                icc=ICCS[:, None, None], power=POWER, alpha=ALPHA)
+    required = np.where(np.isfinite(required), required, -1).astype(np.int32)
+
+    np.save(os.path.join(directory, 'power.npy'), power)
+    np.save(os.path.join(directory, 'required_fellows.npy'), required)
+    default_table.cache_clear()
+    return LookupTable(power, required)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default=DEFAULT_DIRECTORY, help='directory to write the tables to')
+    args = parser.parse_args(argv)
+    build(args.output)
+    print(f'wrote lookup tables to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
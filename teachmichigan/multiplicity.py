@@ -0,0 +1,169 @@
+"""Power for several correlated outcomes under a multiplicity correction.
+
+Each outcome is tested with the same two-sample t-test as ``design``. The
+outcomes' test statistics are simulated jointly. The numerators are
+correlated normals built from a Cholesky factor of the outcome correlation
+matrix. Each outcome has its own variance estimate, so the denominators are
+separate chi-square draws with the same correlation: the diagonal of a
+Wishart matrix (drawn by the Bartlett decomposition), topped up with an
+independent chi-square for outcomes with more degrees of freedom than the
+fewest. Each statistic on its own therefore has exactly the noncentral t
+distribution used by the analytic calculator, and uncorrelated outcomes give
+independent tests. The correlation between outcomes is used as the
+correlation between their test statistics, which holds when the outcomes
+have similar ICCs.
+
+All replicates, scenarios and outcomes are one array, and the correlated
+normal draws are reused for every scenario, so a whole table of effect sizes
+costs one simulation. Cholesky factors are cached by correlation matrix.
+"""
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+
+from .cache import normalize
+from .design import design_effect, linked_ratio, linked_teachers
+from .engine import ttest_ind_nc_df
+
+CORRECTIONS = ('none', 'bonferroni', 'holm', 'bh')
+
+
+@dataclass(frozen=True)
+class MultipleOutcomeResult:
+    """Simulated power per outcome and jointly.
+
+    ``per_outcome`` has the outcomes on its last axis. ``any`` is the chance
+    of rejecting at least one outcome with a non-zero effect, ``all`` the
+    chance of rejecting every one of them (disjunctive and conjunctive power).
+    """
+    per_outcome: np.ndarray
+    any: np.ndarray
+    all: np.ndarray
+    replicates: int
+    correction: str
+
+
+def correlation_matrix(correlation, outcomes):
+    """``outcomes`` x ``outcomes`` matrix from a single (exchangeable) correlation or a full matrix."""
+    correlation = np.asarray(correlation, dtype=float)
+    if correlation.ndim == 0:
+        matrix = np.full((outcomes, outcomes), float(correlation))
+        np.fill_diagonal(matrix, 1.0)
+        return matrix
+    if correlation.shape != (outcomes, outcomes):
+        raise ValueError(f'correlation must be a number or a {outcomes} x {outcomes} matrix')
+    return correlation
+
+
+@functools.lru_cache(maxsize=128)
+def _cholesky(key):
+    shape, values = key
+    matrix = np.array(values, dtype=float).reshape(shape)
+    try:
+        factor = np.linalg.cholesky(matrix)
+    except np.linalg.LinAlgError:
+        raise ValueError('correlation matrix must be positive definite') from None
+    factor.setflags(write=False)
+    return factor
+
+
+def cholesky(matrix):
+    """Lower Cholesky factor of a correlation matrix, cached by its (rounded) values."""
+    return _cholesky(normalize(matrix))
+
+
+def _variance_draws(rng, factor, df, replicates):
+    # Correlated chi-square draws, one per replicate and outcome, with the
+    # scenario axes first. The diagonal of W = L A A' L' with A from the
+    # Bartlett decomposition is chi-square with base_df degrees of freedom and
+    # has the correlation of sums of squares of correlated normals.
+    outcomes = df.shape[-1]
+    scenario = df.shape[:-1]
+    with np.errstate(invalid='ignore'):
+        base_df = np.nanmin(np.where(np.isnan(df), np.inf, df), axis=-1)
+    base_df = np.where(np.isfinite(base_df), base_df, 1.0)
+    shape = scenario + (replicates, outcomes)
+    rows = np.arange(outcomes)
+    diagonal = 2 * rng.standard_gamma(np.broadcast_to(np.fmax(base_df[..., None, None] - rows, 1) / 2, shape))
+    bartlett = np.tril(rng.standard_normal((replicates, outcomes, outcomes)), k=-1)
+    bartlett = np.broadcast_to(bartlett, scenario + bartlett.shape).copy()
+    bartlett[..., rows, rows] = np.sqrt(diagonal)
+    chi2 = (np.einsum('ij,...jk->...ik', factor, bartlett) ** 2).sum(axis=-1)
+    # Outcomes with more degrees of freedom add an independent remainder
+    extra = np.where(np.isnan(df), 0.0, df - base_df[..., None])[..., None, :]
+    if np.any(extra > 0):
+        chi2 = chi2 + 2 * rng.standard_gamma(np.broadcast_to(np.fmax(extra, 1e-300) / 2, shape)) * (extra > 0)
+    return chi2
+
+
+def adjust(p_values, alpha=0.05, correction='holm'):
+    """Boolean rejections for p-values with the outcomes on the last axis."""
+    if correction not in CORRECTIONS:
+        raise ValueError(f'correction must be one of {CORRECTIONS}, got {correction!r}')
+    p_values = np.asarray(p_values, dtype=float)
+    outcomes = p_values.shape[-1]
+    alpha = np.asarray(alpha, dtype=float)[..., None]
+    if correction == 'none':
+        return p_values <= alpha
+    if correction == 'bonferroni':
+        return p_values <= alpha / outcomes
+    order = np.argsort(p_values, axis=-1)
+    ranked = np.take_along_axis(p_values, order, axis=-1)
+    rank = np.arange(1, outcomes + 1)
+    if correction == 'holm':
+        # Step down: reject in order of p-value until the first failure
+        reject_ranked = np.cumprod(ranked <= alpha / (outcomes - rank + 1), axis=-1).astype(bool)
+    else:
+        # Benjamini-Hochberg step up: reject everything up to the largest
+        # rank whose p-value is under its threshold
+        passing = ranked <= alpha * rank / outcomes
+        last = np.where(passing, rank, 0).max(axis=-1, keepdims=True)
+        reject_ranked = rank <= last
+    reject = np.empty_like(reject_ranked)
+    np.put_along_axis(reject, order, reject_ranked, axis=-1)
+    return reject
+
+
+def multiple_outcome_power(n_teachers, outcome_share, effect_sizes, correlation=0.0, students_per_teacher=22,
+                           icc=0.0, alpha=0.05, correction='holm', replicates=20_000, seed=None, class_size_cv=0.0,
+                           ratio=1.0, r2_student=0.0, r2_teacher=0.0):
+    """Simulated power for ``K`` outcomes, the last axis of ``effect_sizes``.
+
+    The other arguments broadcast against ``effect_sizes`` as in
+    ``teacher_power``; pass per-outcome values (such as ICCs) along the last
+    axis. ``correlation`` is a single correlation shared by every pair of
+    outcomes or a ``K`` x ``K`` matrix. ``alpha`` is the familywise (or, for
+    ``'bh'``, false discovery) level; tests are two-sided.
+    """
+    from scipy import special
+
+    effect_sizes = np.atleast_1d(np.asarray(effect_sizes, dtype=float))
+    outcomes = effect_sizes.shape[-1]
+    factor = cholesky(correlation_matrix(correlation, outcomes))
+
+    nobs1 = linked_teachers(n_teachers, outcome_share) * np.asarray(students_per_teacher, dtype=float)
+    deff = design_effect(students_per_teacher, icc, class_size_cv, r2_student, r2_teacher)
+    nc, df = ttest_ind_nc_df(effect_sizes, nobs1, deff, linked_ratio(n_teachers, outcome_share, ratio))
+    nc, df = np.broadcast_arrays(nc, df)
+
+    rng = np.random.default_rng(seed)
+    normals = rng.standard_normal((replicates, outcomes)) @ factor.T
+    # Scenario axes first, then replicates, then outcomes
+    scenario = nc.shape[:-1]
+    expand = (slice(None),) * len(scenario) + (None, slice(None))
+    chi2 = _variance_draws(rng, factor, df, replicates)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (normals + nc[expand]) / np.sqrt(chi2 / df[expand])
+        p_values = 2 * special.stdtr(df[expand], -np.abs(t))
+    p_values = np.where(np.isnan(p_values), 1.0, p_values)
+    reject = adjust(p_values, alpha, correction)
+
+    true_effect = np.broadcast_to(effect_sizes != 0, nc.shape)[expand]
+    detected = reject & true_effect
+    any_power = detected.any(axis=-1).mean(axis=-1)
+    all_power = (detected | ~true_effect).all(axis=-1).mean(axis=-1)
+    # No outcome with an effect: neither joint power is meaningful
+    has_effect = true_effect.any(axis=-1)[..., 0]
+    all_power = np.where(has_effect, all_power, np.nan)
+    return MultipleOutcomeResult(reject.mean(axis=-2), any_power, all_power, replicates, correction)
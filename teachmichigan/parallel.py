@@ -0,0 +1,129 @@
+"""Process-pool execution for large grid sweeps and simulations.
+
+Work is split into shards that run in a ``ProcessPoolExecutor``. Each shard
+writes its results straight into a shared-memory buffer owned by the parent,
+so only the small shard descriptions cross the process boundary.
+
+Simulation shards draw from independent streams spawned from one
+``SeedSequence``. The streams depend on the seed and the number of shards,
+never on the number of workers, so a run reproduces exactly on a laptop or
+on a 32-core server.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .design import PowerSurface, teacher_power
+from .simulate import SimulationResult, simulate_power, wilson_interval
+
+DEFAULT_SIMULATION_SHARDS = 64
+
+
+class _SharedArray:
+    # A NumPy array backed by named shared memory; the creator unlinks it
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape, self.dtype = tuple(shape), np.dtype(dtype)
+        size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def spec(self):
+        return self.shm.name, self.shape, self.dtype.str
+
+    def close(self):
+        del self.array
+        self.shm.close()
+
+
+def _split(total, shards):
+    bounds = np.linspace(0, total, min(shards, total) + 1).astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _default_workers():
+    return os.cpu_count() or 1
+
+
+def _surface_shard(spec, coords, alpha, start, stop):
+    out = _SharedArray(spec[1], spec[2], name=spec[0])
+    try:
+        shape = tuple(len(values) for values in coords)
+        index = np.unravel_index(np.arange(start, stop), shape)
+        n_teachers, outcome_share, effect_size, icc, students = (values[i] for values, i in zip(coords, index))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out.array.reshape(-1)[start:stop] = teacher_power(
+                n_teachers, outcome_share, effect_size, students_per_teacher=students, icc=icc, alpha=alpha)
+    finally:
+        out.close()
+
+
+def parallel_power_surface(n_teachers, outcome_share, effect_size, icc=0.0, students_per_teacher=22, alpha=0.05,
+                           workers=None, shards=None):
+    """``design.power_surface`` computed across a process pool.
+
+    The grid is flattened and cut into ``shards`` contiguous ranges (four per
+    worker by default) so uneven shards even out across workers.
+    """
+    dims = ('n_teachers', 'outcome_share', 'effect_size', 'icc', 'students_per_teacher')
+    coords = [np.atleast_1d(np.asarray(value, dtype=float))
+              for value in (n_teachers, outcome_share, effect_size, icc, students_per_teacher)]
+    shape = tuple(len(values) for values in coords)
+    workers = workers or _default_workers()
+    shards = shards or 4 * workers
+
+    out = _SharedArray(shape, np.float64)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_surface_shard, out.spec, coords, alpha, start, stop)
+                       for start, stop in _split(int(np.prod(shape)), shards)]
+            for future in futures:
+                future.result()
+        values = out.array.copy()
+    finally:
+        out.close()
+        out.shm.unlink()
+    return PowerSurface(dims, dict(zip(dims, coords)), values)
+
+
+def _simulation_shard(spec, shard, seed, replicates, kwargs):
+    out = _SharedArray(spec[1], spec[2], name=spec[0])
+    try:
+        result = simulate_power(replicates=replicates, seed=seed, **kwargs)
+        out.array[shard] = result.rejections
+    finally:
+        out.close()
+
+
+def parallel_simulate_power(n_treatment, n_control=None, effect_size=0.0, students_per_teacher=22, icc=0.0,
+                            replicates=10_000, analysis='cluster_mean', alpha=0.05, seed=None, confidence=0.95,
+                            workers=None, shards=DEFAULT_SIMULATION_SHARDS):
+    """``simulate.simulate_power`` with replicates split across a process pool.
+
+    Shard ``i`` uses the ``i``-th child of ``SeedSequence(seed)``, so results
+    are reproducible for a given ``seed`` and ``shards`` whatever ``workers``
+    is.
+    """
+    effect_size = np.asarray(effect_size, dtype=float)
+    kwargs = dict(n_treatment=n_treatment, n_control=n_control, effect_size=effect_size,
+                  students_per_teacher=students_per_teacher, icc=icc, analysis=analysis, alpha=alpha)
+    ranges = _split(replicates, shards)
+    seeds = np.random.SeedSequence(seed).spawn(len(ranges))
+
+    out = _SharedArray((len(ranges),) + effect_size.shape, np.int64)
+    try:
+        with ProcessPoolExecutor(max_workers=workers or _default_workers()) as pool:
+            futures = [pool.submit(_simulation_shard, out.spec, shard, seeds[shard], stop - start, kwargs)
+                       for shard, (start, stop) in enumerate(ranges)]
+            for future in futures:
+                future.result()
+        rejections = out.array.sum(axis=0)
+    finally:
+        out.close()
+        out.shm.unlink()
+
+    ci_low, ci_high = wilson_interval(rejections, replicates, confidence)
+    return SimulationResult(rejections / replicates, ci_low, ci_high, rejections, replicates, analysis)
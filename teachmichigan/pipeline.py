@@ -0,0 +1,41 @@
+"""Dependency-tracked stages for incremental recomputation.
+
+Each stage declares the values it depends on. Its last result is kept in a
+state mapping (Streamlit's ``session_state`` in the app) together with those
+values, and the stage is only recomputed when one of them changes. Later
+stages depend on the *outputs* of earlier ones, so a change that leaves an
+intermediate result unchanged (say, a different outcome share that links the
+same number of fellows) stops propagating there.
+"""
+import time
+
+from .cache import normalize
+
+
+class Pipeline:
+    """Runs stages against a mutable ``state`` mapping, counting reuses.
+
+    ``timings`` holds the seconds spent computing each recomputed stage.
+    """
+
+    def __init__(self, state=None):
+        self.state = {} if state is None else state
+        self.hits = 0
+        self.misses = 0
+        self.recomputed = []
+        self.timings = {}
+
+    def run(self, name, depends_on, compute):
+        """Result of ``compute()``, reused while ``depends_on`` is unchanged."""
+        key = tuple(normalize(value) for value in depends_on)
+        entry = self.state.get(name)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        self.recomputed.append(name)
+        start = time.perf_counter()
+        value = compute()
+        self.timings[name] = time.perf_counter() - start
+        self.state[name] = (key, value)
+        return value
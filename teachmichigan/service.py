@@ -0,0 +1,279 @@
+"""Local JSON-over-HTTP compute service with request batching.
+
+    python -m teachmichigan.service --port 8502
+
+Endpoints take a JSON object (POST body, or query parameters on GET) with the
+same arguments and conventions as the functions in ``calculator``:
+
+* ``/power`` -- ``n_teachers``, ``outcome_share``, ``effect_size``
+* ``/sample-size`` -- ``effect_size``, ``outcome_share``
+* ``/mdes`` -- ``n_teachers``, ``outcome_share``, ``power``
+
+plus ``students_per_teacher`` (22), ``use_clustering`` (false), ``icc`` (0),
+``r2_student`` (0) and ``r2_teacher`` (0). Any numeric argument may be a
+list; lists within one request broadcast against each other and the result
+has their shape. ``/health`` reports request and batch counts. A calculation
+that fails answers 500 with an ``error`` message, like the 4xx responses.
+
+Requests for the same endpoint that arrive within ``window`` seconds of each
+other are flattened into one array and evaluated with a single vectorized
+call, so many small requests from a dashboard cost about as much as one.
+"""
+import argparse
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from .design import minimum_detectable_effect, required_fellows, teacher_power
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 0.002
+MAX_BATCH = 4096
+MAX_BODY = 1 << 20
+
+_COMMON = {'students_per_teacher': 22, 'use_clustering': False, 'icc': 0, 'r2_student': 0, 'r2_teacher': 0}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _prepare(params, required, defaults):
+    # Validate one request and broadcast its numeric arguments to a flat batch
+    unknown = set(params) - set(required) - set(defaults) - set(_COMMON)
+    if unknown:
+        raise BadRequest(f'unknown arguments: {", ".join(sorted(unknown))}')
+    missing = [name for name in required if name not in params]
+    if missing:
+        raise BadRequest(f'missing arguments: {", ".join(missing)}')
+    values = {**_COMMON, **defaults, **params}
+    use_clustering = values.pop('use_clustering')
+    if isinstance(use_clustering, str):
+        use_clustering = use_clustering.lower() in ('1', 'true', 'yes')
+    if not use_clustering:
+        values['icc'] = 0
+    try:
+        arrays = {name: np.asarray(value, dtype=float) for name, value in values.items()}
+        shape = np.broadcast_shapes(*(array.shape for array in arrays.values()))
+    except (TypeError, ValueError) as error:
+        raise BadRequest(f'arguments must be numbers or lists of numbers: {error}') from None
+    return shape, {name: np.broadcast_to(array, shape).ravel() for name, array in arrays.items()}
+
+
+def _json_values(values, shape):
+    values = np.asarray(values, dtype=float).reshape(shape)
+    # JSON has no nan or infinity; unreachable or undefined results are null
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+def _power(c):
+    power = teacher_power(c['n_teachers'], c['outcome_share'], c['effect_size'], c['students_per_teacher'],
+                          icc=c['icc'], r2_student=c['r2_student'], r2_teacher=c['r2_teacher'])
+    return {'power': power}
+
+
+def _sample_size(c):
+    with np.errstate(invalid='ignore'):
+        fellows = required_fellows(c['effect_size'], c['outcome_share'], c['students_per_teacher'], icc=c['icc'],
+                                   r2_student=c['r2_student'], r2_teacher=c['r2_teacher'])
+    # Same convention as calculate_sample_size: totals cover both groups
+    return {'required_teachers': fellows * 2, 'fellows': fellows}
+
+
+def _mdes(c):
+    mdes = minimum_detectable_effect(c['n_teachers'], c['outcome_share'], c['students_per_teacher'], icc=c['icc'],
+                                     power=c['power'], r2_student=c['r2_student'], r2_teacher=c['r2_teacher'])
+    return {'mdes': mdes}
+
+
+ENDPOINTS = {
+    '/power': (('n_teachers', 'outcome_share', 'effect_size'), {}, _power),
+    '/sample-size': (('effect_size', 'outcome_share'), {}, _sample_size),
+    '/mdes': (('n_teachers', 'outcome_share'), {'power': 0.8}, _mdes),
+}
+
+
+def evaluate_batch(compute, prepared):
+    """Run ``compute`` once over the concatenation of prepared requests and split the results."""
+    names = prepared[0][1].keys()
+    columns = {name: np.concatenate([arrays[name] for _, arrays in prepared]) for name in names}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        outputs = compute(columns)
+    bounds = np.cumsum([0] + [int(np.prod(shape)) for shape, _ in prepared])
+    return [{name: _json_values(np.asarray(values)[start:stop], shape) for name, values in outputs.items()}
+            for (shape, _), start, stop in zip(prepared, bounds[:-1], bounds[1:])]
+
+
+class Batcher:
+    """Coalesces submissions arriving within ``window`` seconds into one evaluation."""
+
+    def __init__(self, compute, window=DEFAULT_WINDOW, max_batch=MAX_BATCH):
+        self.compute = compute
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.requests = 0
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, prepared):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((prepared, future))
+        self.requests += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batches += 1
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch):
+        # The vectorized call runs in a worker thread so the event loop keeps
+        # accepting the requests that will form the next batch
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, evaluate_batch, self.compute, [prepared for prepared, _ in batch])
+        except Exception as error:  # noqa: BLE001 - every waiter must be released
+            logger.exception('batch of %d requests failed', len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class PowerService:
+    """The HTTP front end: one ``Batcher`` per endpoint."""
+
+    def __init__(self, window=DEFAULT_WINDOW, max_batch=MAX_BATCH):
+        self.batchers = {path: Batcher(compute, window, max_batch)
+                         for path, (_, _, compute) in ENDPOINTS.items()}
+
+    def stats(self):
+        return {path: {'requests': batcher.requests, 'batches': batcher.batches}
+                for path, batcher in self.batchers.items()}
+
+    async def handle(self, method, target, body):
+        """Status code and JSON payload for one request."""
+        url = urlsplit(target)
+        if url.path == '/health':
+            return 200, {'status': 'ok', 'endpoints': self.stats()}
+        if url.path not in ENDPOINTS:
+            return 404, {'error': f'unknown endpoint {url.path}'}
+        if method == 'GET':
+            params = {}
+            for name, value in parse_qsl(url.query):
+                try:
+                    params[name] = json.loads(value)
+                except ValueError:
+                    params[name] = value
+        elif method == 'POST':
+            try:
+                params = json.loads(body or b'{}')
+            except ValueError:
+                return 400, {'error': 'body must be a JSON object'}
+            if not isinstance(params, dict):
+                return 400, {'error': 'body must be a JSON object'}
+        else:
+            return 405, {'error': f'method {method} not allowed'}
+        required, defaults, _ = ENDPOINTS[url.path]
+        try:
+            prepared = _prepare(params, required, defaults)
+        except BadRequest as error:
+            return 400, {'error': str(error)}
+        try:
+            return 200, await self.batchers[url.path].submit(prepared)
+        except Exception:  # noqa: BLE001 - the batcher has already logged it
+            return 500, {'error': 'calculation failed'}
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'malformed request line'}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': 'invalid Content-Length'}, False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {'error': 'request body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+                status, payload = await self.handle(method.upper(), target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                   413: 'Payload Too Large', 500: 'Internal Server Error'}
+        data = json.dumps(payload).encode()
+        writer.write(
+            f'HTTP/1.1 {status} {reasons.get(status, "")}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(data)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + data)
+        await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=8502, window=DEFAULT_WINDOW, max_batch=MAX_BATCH):
+    service = PowerService(window, max_batch)
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    logger.info('serving on %s', ', '.join(str(sock.getsockname()) for sock in server.sockets))
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve power, sample-size and MDES calculations over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--window-ms', type=float, default=DEFAULT_WINDOW * 1000,
+                        help='how long to wait for more requests before evaluating a batch')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    try:
+        asyncio.run(serve(args.host, args.port, args.window_ms / 1000, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
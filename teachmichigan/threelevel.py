@@ -0,0 +1,84 @@
+"""Three-level designs: students within teachers within schools.
+
+Fellows and comparison teachers are placed in different schools, so the
+school is the unit that separates the groups. With ``J`` teachers per school
+and ``m`` students per teacher, the variance of a student outcome standardized
+to one splits into ``icc_school`` between schools, ``icc_teacher`` between
+teachers within a school and the rest within classrooms. The treatment effect
+is then tested on ``2 * schools - 2`` degrees of freedom with noncentrality
+
+    effect_size / sqrt((1/K1 + 1/K0) * (icc_school + icc_teacher / J + (1 - icc_school - icc_teacher) / (J m)))
+
+for ``K1`` fellow schools and ``K0`` comparison schools. Every function
+broadcasts over all of its arguments.
+"""
+import numpy as np
+
+from .engine import as_result, bisect_integer, bracket, nct_power, solve_nc
+
+
+def design_effect_3level(students_per_teacher=22, teachers_per_school=1, icc_teacher=0.0, icc_school=0.0):
+    """Variance inflation relative to sampling the same students independently."""
+    m = np.asarray(students_per_teacher, dtype=float)
+    j = np.asarray(teachers_per_school, dtype=float)
+    return 1 + (m - 1) * np.asarray(icc_teacher, dtype=float) + (j * m - 1) * np.asarray(icc_school, dtype=float)
+
+
+def _school_mean_variance(students_per_teacher, teachers_per_school, icc_teacher, icc_school):
+    # Variance of one school's mean outcome, in student standard deviation units
+    m = np.asarray(students_per_teacher, dtype=float)
+    j = np.asarray(teachers_per_school, dtype=float)
+    icc_teacher = np.asarray(icc_teacher, dtype=float)
+    icc_school = np.asarray(icc_school, dtype=float)
+    return icc_school + icc_teacher / j + (1 - icc_school - icc_teacher) / (j * m)
+
+
+def _standard_error(schools_per_arm, teachers_per_school, students_per_teacher, icc_teacher, icc_school):
+    k = np.asarray(schools_per_arm, dtype=float)
+    variance = _school_mean_variance(students_per_teacher, teachers_per_school, icc_teacher, icc_school)
+    with np.errstate(divide='ignore'):
+        return np.sqrt(2 / k * variance)
+
+
+def power_3level(effect_size, schools_per_arm, teachers_per_school, students_per_teacher=22,
+                 icc_teacher=0.0, icc_school=0.0, alpha=0.05):
+    """Two-sided power with ``schools_per_arm`` schools in each group."""
+    se = _standard_error(schools_per_arm, teachers_per_school, students_per_teacher, icc_teacher, icc_school)
+    df = 2 * np.asarray(schools_per_arm, dtype=float) - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return nct_power(np.asarray(effect_size, dtype=float) / se, np.where(df > 0, df, np.nan), alpha=alpha)
+
+
+def mdes_3level(schools_per_arm, teachers_per_school, students_per_teacher=22, icc_teacher=0.0, icc_school=0.0,
+                power=0.8, alpha=0.05):
+    """Minimum detectable effect size with ``schools_per_arm`` schools in each group."""
+    se = _standard_error(schools_per_arm, teachers_per_school, students_per_teacher, icc_teacher, icc_school)
+    df = 2 * np.asarray(schools_per_arm, dtype=float) - 2
+    with np.errstate(invalid='ignore'):
+        nc = np.asarray(solve_nc(np.where(df > 0, df, np.nan), power=power, alpha=alpha))
+    return as_result(nc * se)
+
+
+def required_schools_3level(effect_size, teachers_per_school, students_per_teacher=22, icc_teacher=0.0,
+                            icc_school=0.0, power=0.8, alpha=0.05):
+    """Schools needed in each group to reach ``power`` (nan if unreachable).
+
+    Power increases with the number of schools, so every scenario is solved
+    together by a batched bisection over whole schools. Multiply by
+    ``teachers_per_school`` for the number of fellows.
+    """
+    args = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in
+                                 (effect_size, teachers_per_school, students_per_teacher,
+                                  icc_teacher, icc_school, power, alpha)))
+    effect_size, teachers_per_school, students_per_teacher, icc_teacher, icc_school, power, alpha = args
+
+    def shortfall(schools):
+        return np.asarray(power_3level(effect_size, schools, teachers_per_school, students_per_teacher,
+                                       icc_teacher, icc_school, alpha)) - power
+
+    # One school per group leaves no degrees of freedom, so two is the minimum
+    lo = np.ones(effect_size.shape)
+    hi = bracket(shortfall, lo, 16.0)
+    solvable = np.isfinite(hi)
+    schools = bisect_integer(shortfall, lo, np.where(solvable, hi, lo + 1))
+    return as_result(np.where(solvable, schools, np.nan))
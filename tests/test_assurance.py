@@ -0,0 +1,36 @@
+"""Tests for power averaged over priors on the ICC and effect size."""
+import numpy as np
+import pytest
+
+from teachmichigan.assurance import beta_prior, expected_power, normal_prior, uniform_prior
+from teachmichigan.design import teacher_power
+
+
+def test_point_values_give_plain_power():
+    assert expected_power(50, 1.0, 0.2, icc=0.1) == teacher_power(50, 1.0, 0.2, icc=0.1)
+
+
+def test_uniform_icc_prior_averages_over_the_range():
+    iccs = np.linspace(0.1, 0.3, 100_001)
+    dense = teacher_power(50, 1.0, 0.2, icc=iccs).mean()
+    assurance = expected_power(50, 1.0, 0.2, icc=uniform_prior(0.1, 0.3))
+    assert assurance == pytest.approx(0.5524623482720221, rel=1e-9)
+    assert assurance == pytest.approx(dense, abs=1e-5)
+
+
+def test_effect_size_prior_matches_monte_carlo():
+    draws = np.random.default_rng(0).normal(0.2, 0.05, 400_000)
+    simulated = teacher_power(50, 1.0, draws, icc=0.1).mean()
+    assert expected_power(50, 1.0, normal_prior(0.2, 0.05), icc=0.1) == pytest.approx(simulated, abs=1e-3)
+
+
+def test_priors_broadcast_over_scenarios():
+    result = expected_power(np.array([25, 50, 100])[:, None], 1.0, normal_prior([0.1, 0.2], 0.05),
+                            icc=beta_prior(0.15, 0.05))
+    assert result.shape == (3, 2)
+    assert result[1, 0] == pytest.approx(expected_power(50, 1.0, normal_prior(0.1, 0.05), icc=beta_prior(0.15, 0.05)))
+
+
+def test_beta_prior_rejects_impossible_spread():
+    with pytest.raises(ValueError):
+        beta_prior(0.1, 0.5)
@@ -0,0 +1,46 @@
+"""Tests for expected power under teacher and student attrition."""
+import numpy as np
+import pytest
+from scipy import stats
+
+from teachmichigan.attrition import expected_power_with_attrition, linked_distribution, retained_class_size
+from teachmichigan.design import teacher_power
+from teachmichigan.engine import ttest_ind_power
+
+
+@pytest.mark.parametrize('ratio', [1.0, 1.5])
+def test_no_attrition_is_plain_power(ratio):
+    assert expected_power_with_attrition(60, 0.5, 0.2, icc=0.1, ratio=ratio) == pytest.approx(
+        teacher_power(60, 0.5, 0.2, icc=0.1, ratio=ratio), rel=1e-12)
+
+
+def test_attrition_value():
+    power = expected_power_with_attrition(60, 0.5, 0.2, 0.1, 0.1, icc=0.1)
+    assert power == pytest.approx(0.48259753531529864, rel=1e-9)
+    assert power < teacher_power(60, 0.5, 0.2, icc=0.1)
+
+
+def test_teacher_attrition_matches_explicit_binomial_sum():
+    # 12 fellows and 12 comparison teachers linked, each kept with probability 0.8
+    kept = np.arange(13)
+    pmf = stats.binom.pmf(kept, 12, 0.8)
+    k1, k0 = kept[:, None], kept[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        power = ttest_ind_power(0.3, k1 * 22.0, deff=1 + 21 * 0.05, ratio=k0 / k1)
+    power = np.where((k1 > 0) & (k0 > 0), power, 0.0)
+    expected = (power * pmf[:, None] * pmf[None, :]).sum()
+    assert expected_power_with_attrition(24, 0.5, 0.3, 0.2, icc=0.05) == pytest.approx(expected, abs=1e-9)
+
+
+def test_linked_distribution_with_uncertain_share():
+    support, pmf = linked_distribution(60, 0.5, 0.05, retention=0.9)
+    assert pmf.sum() == pytest.approx(1.0)
+    assert (support * pmf).sum() == pytest.approx(60 * 0.5 * 0.9, rel=1e-6)
+    with pytest.raises(ValueError):
+        linked_distribution(60, 0.5, 0.5)
+
+
+def test_student_attrition_shrinks_and_spreads_classes():
+    m, cv = retained_class_size(22, 0.0, 0.1)
+    assert m == pytest.approx(19.8)
+    assert cv == pytest.approx(np.sqrt(0.1 / (22 * 0.9)))
@@ -0,0 +1,82 @@
+"""Tests for the shared result cache."""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from teachmichigan.cache import ResultCache, memoize, normalize
+
+
+@dataclass
+class Result:
+    values: np.ndarray
+    parts: tuple
+
+
+def counted(cache):
+    calls = []
+
+    @memoize(cache=cache)
+    def compute(x, scale=1):
+        calls.append(x)
+        return np.asarray(x, dtype=float) * scale
+
+    return compute, calls
+
+
+def test_equivalent_arguments_share_a_key():
+    assert normalize(0.1 + 0.2) == normalize(0.3)
+    assert normalize(-0.0) == normalize(0.0)
+    assert normalize([1, 2]) == normalize(np.array([1, 2])) == normalize(pd.Series([1, 2]))
+    hash(normalize(pd.Series([0.1, 0.2])))
+
+
+def test_hits_and_misses():
+    cache = ResultCache()
+    compute, calls = counted(cache)
+    compute([1, 2])
+    compute(np.array([1, 2]), scale=1)
+    compute([1, 2], scale=2)
+    assert len(calls) == 2
+    assert cache.info()['hits'] == 1 and cache.info()['misses'] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(maxsize=2)
+    compute, calls = counted(cache)
+    compute(1)
+    compute(2)
+    compute(1)
+    compute(3)
+    compute(1)
+    compute(2)
+    assert calls == [1, 2, 3, 2]
+
+
+def test_unhashable_arguments_are_computed_every_time():
+    cache = ResultCache()
+    calls = []
+
+    @memoize(cache=cache)
+    def compute(options):
+        calls.append(options)
+        return options['x']
+
+    assert compute({'x': 1}) == compute({'x': 1}) == 1
+    assert len(calls) == 2
+    assert len(cache) == 0
+
+
+def test_cached_results_are_read_only_at_every_level():
+    cache = ResultCache()
+
+    @memoize(cache=cache)
+    def compute(n):
+        return Result(np.arange(n), (np.zeros(n), {'inner': np.ones(n)}))
+
+    result = compute(3)
+    for array in (result.values, result.parts[0], result.parts[1]['inner']):
+        with pytest.raises(ValueError):
+            array[0] = 99
+    assert compute(3) is result
@@ -0,0 +1,35 @@
+"""Tests for the app-facing entry points in ``calculator``."""
+import numpy as np
+import pytest
+
+from teachmichigan.calculator import calculate_mdes_curve, calculate_power, calculate_sample_size
+from teachmichigan.design import minimum_detectable_effect, required_fellows
+
+
+def test_sample_size_counts_both_groups():
+    assert calculate_sample_size(0.12, 0.5) == 2 * required_fellows(0.12, 0.5)
+    np.testing.assert_array_equal(calculate_sample_size(np.array([0.12, 0.24]), 0.5),
+                                  2 * required_fellows(np.array([0.12, 0.24]), 0.5))
+
+
+def test_sample_size_adds_ratio_comparison_teachers_per_fellow():
+    # 75 fellows (37 linked) with 150 comparison teachers (75 linked) fall short
+    assert calculate_sample_size(0.12, 0.5, ratio=2) == 76 + 152
+    np.testing.assert_array_equal(calculate_sample_size(0.12, 0.5, ratio=np.array([1, 2])), [200, 228])
+    assert np.shape(calculate_power(40, 0.5, 0.2, ratio=np.array([1, 2]))) == (2,)
+
+
+def test_sample_size_without_linked_fellows_is_undefined():
+    assert calculate_sample_size(0.12, 0.0) is None
+    sizes = calculate_sample_size(0.12, np.array([0.0, 0.5]))
+    assert np.isnan(sizes[0]) and sizes[1] == calculate_sample_size(0.12, 0.5)
+
+
+def test_mdes_curve_matches_pointwise_solves():
+    fellows, mdes = calculate_mdes_curve(0.5, use_clustering=True, icc=0.2)
+    assert fellows[0] == 1 and fellows[-1] == 1000
+    # One fellow at a 50% share links no one to outcomes
+    assert np.isnan(mdes[0])
+    for n in (2, 100, 999):
+        assert mdes[n - 1] == pytest.approx(minimum_detectable_effect(n, 0.5, 22, icc=0.2), rel=1e-12)
+    assert np.all(np.diff(mdes[1:]) <= 0)
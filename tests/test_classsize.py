@@ -0,0 +1,64 @@
+"""Tests for class-size summaries and the unequal-cluster design effect."""
+import io
+
+import numpy as np
+import pytest
+
+from teachmichigan.calculator import calculate_power
+from teachmichigan.classsize import ClassSizeSummary, read_class_sizes
+from teachmichigan.design import design_effect
+
+
+def test_design_effect():
+    assert design_effect(22, 0.2) == pytest.approx(5.2)
+    # Unequal classes inflate the design effect by (cv**2 + 1)
+    assert design_effect(22, 0.2, 0.5) == pytest.approx(1 + (1.25 * 22 - 1) * 0.2)
+
+
+def test_chunked_summary_matches_numpy():
+    rng = np.random.default_rng(0)
+    sizes = rng.integers(5, 40, size=10_000).astype(float)
+    chunked = ClassSizeSummary.from_sizes(np.array_split(sizes, 7))
+    assert chunked.count == sizes.size
+    assert chunked.mean == pytest.approx(sizes.mean())
+    assert chunked.variance == pytest.approx(sizes.var())
+    assert ClassSizeSummary.from_sizes(list(sizes)).cv == pytest.approx(sizes.std() / sizes.mean())
+
+
+def test_distribution_matches_expanded_sizes():
+    summary = ClassSizeSummary.from_distribution([18, 22, 30], [2, 5, 1])
+    expanded = ClassSizeSummary.from_sizes(np.repeat([18, 22, 30], [2, 5, 1]))
+    assert summary.count == expanded.count
+    assert summary.mean == pytest.approx(expanded.mean)
+    assert summary.m2 == pytest.approx(expanded.m2)
+
+
+def test_read_class_sizes_streams_in_chunks():
+    roster = 'teacher,class_size\n' + ''.join(f't{i},{20 + i % 5}\n' for i in range(1000))
+    summary = read_class_sizes(io.StringIO(roster), column='class_size', chunk_rows=64)
+    expected = np.array([20 + i % 5 for i in range(1000)], dtype=float)
+    assert summary.count == 1000
+    assert summary.mean == pytest.approx(expected.mean())
+    assert summary.variance == pytest.approx(expected.var())
+
+
+@pytest.mark.parametrize('roster', ['', 'class_size\n', 'class_size\n20\n0\n', 'class_size\n20\n-4\n',
+                                    'class_size\n20\ninf\n', 'teacher,class_size\nt1,20\nt2\n'])
+def test_read_class_sizes_rejects_bad_rosters(roster):
+    with pytest.raises(ValueError):
+        read_class_sizes(io.StringIO(roster), column='class_size')
+
+
+@pytest.mark.parametrize('sizes', [[], np.array([]), [0, 0], [20, -1], [20, np.inf], [20, np.nan]])
+def test_summaries_reject_empty_or_invalid_sizes(sizes):
+    with pytest.raises(ValueError):
+        ClassSizeSummary.from_sizes(sizes)
+    with pytest.raises(ValueError):
+        calculate_power(100, 0.5, 0.2, class_sizes=sizes)
+
+
+def test_calculator_rejects_an_empty_summary():
+    with pytest.raises(ValueError):
+        ClassSizeSummary.from_distribution([20, 25], [0, 0])
+    with pytest.raises(ValueError):
+        calculate_power(100, 0.5, 0.2, class_sizes=ClassSizeSummary())
@@ -0,0 +1,40 @@
+"""Tests for pooled power as cohorts of fellows accumulate."""
+import numpy as np
+import pytest
+
+from teachmichigan.calculator import calculate_cohort_power
+from teachmichigan.cohorts import cohort_power
+from teachmichigan.design import teacher_power
+from teachmichigan.engine import ttest_ind_power
+
+
+def test_first_cohort_year_equals_single_year_power():
+    result = cohort_power([30, 30, 30], 0.2, 1.0, icc=0.1, retention=0.9)
+    assert result.power[0] == pytest.approx(teacher_power(30, 1.0, 0.2, icc=0.1))
+    assert np.all(np.diff(result.power) > 0)
+
+
+def test_returning_teachers_add_a_class_of_students():
+    # Without clustering a teacher observed twice counts as 44 students
+    result = cohort_power([30, 30], 0.1, 1.0, students_per_teacher=22)
+    assert result.power[1] == pytest.approx(ttest_ind_power(0.1, 30 * 44 + 30 * 22), rel=1e-12)
+    np.testing.assert_array_equal(result.fellows, [30, 60])
+    np.testing.assert_array_equal(result.comparison_teachers, [30, 60])
+
+
+def test_leavers_keep_the_students_already_observed():
+    stay = cohort_power([30, 0, 0], 0.2, icc=0.1, year_icc=0.05, retention=1.0).power
+    leave = cohort_power([30, 0, 0], 0.2, icc=0.1, year_icc=0.05, retention=0.5).power
+    assert leave[0] == stay[0]
+    assert stay[0] < leave[1] < stay[1] and leave[1] < leave[2] < stay[2]
+
+
+def test_trajectories_broadcast_like_single_calls():
+    sizes = np.array([10, 40, 200])
+    result = calculate_cohort_power(sizes[:, None], 4, np.array([0.1, 0.2]), 0.5, use_clustering=True, icc=0.15)
+    assert result.power.shape == (3, 2, 4)
+    single = cohort_power([40] * 4, 0.2, 0.5, icc=0.15)
+    np.testing.assert_allclose(result.power[1, 1], single.power, rtol=1e-12)
+    assert result.first_adequate_year[1, 1] == single.first_adequate_year
+    # Ten fellows a year never detect a small effect within four years
+    assert result.first_adequate_year[0, 0] == np.inf
@@ -0,0 +1,138 @@
+"""Tests for the teacher-level designs built on the power engine."""
+import warnings
+
+import numpy as np
+import pytest
+
+from teachmichigan.attrition import expected_power_with_attrition
+from teachmichigan.cohorts import cohort_power
+from teachmichigan.calculator import calculate_budget_design
+from teachmichigan.design import (best_design_within_budget, comparison_teachers, design_effect, linked_ratio,
+                                  minimum_detectable_effect, optimal_allocation, power_surface, required_fellows,
+                                  teacher_power)
+
+
+def test_power_surface_matches_pointwise_power():
+    surface = power_surface([10, 50, 200], [0.5, 1.0], [0.1, 0.2], icc=[0.0, 0.2], students_per_teacher=22)
+    assert surface.dims == ('n_teachers', 'outcome_share', 'effect_size', 'icc', 'students_per_teacher')
+    assert surface.values.shape == (3, 2, 2, 2, 1)
+    assert surface.values[1, 0, 1, 1, 0] == teacher_power(50, 0.5, 0.2, 22, icc=0.2)
+
+
+def test_power_surface_rejects_nested_ranges():
+    with pytest.raises(ValueError):
+        power_surface([[10, 20]], 1.0, 0.2)
+
+
+def test_sel_drops_the_selected_dimensions():
+    surface = power_surface([10, 50, 200], [0.5, 1.0], [0.1, 0.2], icc=[0.0, 0.2])
+    sliced = surface.sel(icc=0.2, effect_size=0.1)
+    assert sliced.dims == ('n_teachers', 'outcome_share', 'students_per_teacher')
+    np.testing.assert_array_equal(sliced.values, surface.values[:, :, 0, 1, :])
+    with pytest.raises(KeyError):
+        surface.sel(icc=0.3)
+
+
+def test_to_frame_has_one_row_per_point():
+    surface = power_surface([10, 50], [0.5, 1.0], 0.2)
+    frame = surface.to_frame()
+    assert list(frame.columns) == list(surface.dims) + ['power']
+    assert len(frame) == surface.values.size
+    row = frame[(frame.n_teachers == 50) & (frame.outcome_share == 0.5)].iloc[0]
+    assert row.power == teacher_power(50, 0.5, 0.2)
+
+
+def test_required_fellows_is_the_smallest_adequate_design():
+    fellows = required_fellows(0.12, 0.5, 22, icc=0.2)
+    assert fellows == 516
+    assert teacher_power(fellows, 0.5, 0.12, 22, icc=0.2) >= 0.8
+    # Fellows are linked in pairs at a 50% share
+    assert teacher_power(fellows - 2, 0.5, 0.12, 22, icc=0.2) < 0.8
+
+
+def test_required_fellows_broadcasts():
+    effect_sizes = np.array([0.06, 0.12, 0.24])[:, None]
+    shares = np.array([0.5, 1.0])
+    table = required_fellows(effect_sizes, shares, 22, icc=0.2)
+    assert table.shape == (3, 2)
+    assert table[1, 0] == required_fellows(0.12, 0.5, 22, icc=0.2)
+
+
+@pytest.mark.parametrize('ratio', [0.5, 1.0, 1.5, 3.0])
+def test_required_fellows_is_smallest_with_whole_comparison_teachers(ratio):
+    effect_sizes = np.array([0.05, 0.12, 0.3])[:, None, None]
+    shares = np.array([0.07, 0.3, 0.5, 0.93, 1.0])[None, :, None]
+    iccs = np.array([0.0, 0.2])
+    fellows = required_fellows(effect_sizes, shares, 22, icc=iccs, ratio=ratio)
+    assert np.all(teacher_power(fellows, shares, effect_sizes, 22, icc=iccs, ratio=ratio) >= 0.8)
+    assert np.all(teacher_power(fellows - 1, shares, effect_sizes, 22, icc=iccs, ratio=ratio) < 0.8)
+
+
+def test_every_design_counts_comparison_teachers_the_same_way():
+    # 31 fellows at 1.5 per fellow is 47 comparison teachers, 23 of them linked
+    assert linked_ratio(31, 0.5, 1.5) == 23 / 15
+    power = teacher_power(31, 0.5, 0.2, icc=0.1, ratio=1.5)
+    assert power == pytest.approx(0.35948153081184525, rel=1e-9)
+    assert cohort_power([31, 31], 0.2, 0.5, icc=0.1, ratio=1.5).power[0] == pytest.approx(power)
+    assert expected_power_with_attrition(31, 0.5, 0.2, icc=0.1, ratio=1.5) == pytest.approx(power)
+    mdes = minimum_detectable_effect(31, 0.5, icc=0.1, ratio=1.5)
+    assert teacher_power(31, 0.5, mdes, icc=0.1, ratio=1.5) == pytest.approx(0.8, abs=1e-9)
+
+
+def test_optimal_allocation_reaches_power_with_whole_teachers():
+    allocation = optimal_allocation([0.12, 0.2], [0.5, 1.0], 20_000, 2_000, icc=0.2)
+    power = teacher_power(allocation.fellows, [0.5, 1.0], [0.12, 0.2], icc=0.2, ratio=allocation.ratio)
+    assert np.all(power >= 0.8)
+    np.testing.assert_array_equal(allocation.comparison_teachers,
+                                  comparison_teachers(allocation.fellows, allocation.ratio))
+    # A design with fewer fellows at the chosen ratio is underpowered
+    fewer = teacher_power(allocation.fellows - 1, [0.5, 1.0], [0.12, 0.2], icc=0.2, ratio=allocation.ratio)
+    assert np.all(fewer < 0.8)
+
+
+def test_optimal_allocation_with_free_comparison_teachers():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        allocation = optimal_allocation(0.12, 0.5, 20_000, 0, icc=0.2)
+    assert allocation.cost == 20_000 * allocation.fellows
+    assert teacher_power(allocation.fellows, 0.5, 0.12, icc=0.2, ratio=allocation.ratio) >= 0.8
+
+
+def test_mdes_reaches_target_power():
+    mdes = minimum_detectable_effect(100, 0.5, 22, icc=0.2)
+    assert mdes == pytest.approx(0.27303362337329146, rel=1e-9)
+    assert teacher_power(100, 0.5, mdes, 22, icc=0.2) == pytest.approx(0.8, abs=1e-9)
+
+
+def test_covariates_scale_each_variance_component():
+    assert design_effect(22, 0.2, 0.3, 0.5, 0.4) == pytest.approx(3.2776)
+    assert design_effect(22, 0.2, 0.3, 0.0, 0.0) == design_effect(22, 0.2, 0.3)
+    # A pretest explaining half of each component halves the design effect
+    assert design_effect(22, 0.2, 0.0, 0.5, 0.5) == pytest.approx(design_effect(22, 0.2) / 2)
+
+
+def test_covariates_broadcast_and_reduce_required_fellows():
+    r2 = np.array([0.0, 0.3, 0.6])
+    fellows = required_fellows(0.12, 1.0, 22, icc=0.2, r2_student=r2[:, None], r2_teacher=r2)
+    assert fellows.shape == (3, 3)
+    assert fellows[0, 0] == required_fellows(0.12, 1.0, 22, icc=0.2)
+    assert np.all(np.diff(fellows, axis=0) <= 0) and np.all(np.diff(fellows, axis=1) < 0)
+    power = teacher_power(50, 1.0, 0.2, icc=0.2, r2_teacher=r2)
+    assert np.all(np.diff(power) > 0)
+
+
+def test_budget_design_stays_within_budget():
+    best = calculate_budget_design(1_000_000, 20_000, 2_000, 0.12, 0.5, cost_student=5)
+    assert best.cost <= 1_000_000
+    assert best.power == pytest.approx(np.nanmax(best.surface.values))
+
+
+def test_budget_design_power_counts_the_teachers_it_buys():
+    best = best_design_within_budget(500_000, 20_000, 2_000, 0.2, [0.5, 0.8], icc=0.1)
+    assert best.power == teacher_power(best.fellows, best.outcome_share, 0.2, icc=0.1,
+                                       ratio=best.comparison_teachers / best.fellows)
+    assert best.cost == 20_000 * best.fellows + 2_000 * best.comparison_teachers <= 500_000
+    # Whatever the fellows leave buys comparison teachers
+    assert 500_000 - best.cost < 2_000
+    with pytest.raises(ValueError):
+        best_design_within_budget(21_000, 20_000, 2_000, 0.2, 0.5)
@@ -0,0 +1,88 @@
+"""Tests for the vectorized power engine, pinned against statsmodels, which it replaces."""
+import numpy as np
+import pytest
+
+from teachmichigan.engine import (nct_power, normal_df_threshold, normal_error, normal_power, select_power,
+                                 solve_effect_size, solve_nobs1, ttest_ind_power, ttest_ind_power_auto)
+
+EFFECT_SIZES = [0.03, 0.12, 0.24, 0.5]
+NOBS1 = [5, 44, 550, 22000]
+RATIOS = [0.5, 1, 3]
+ALPHAS = [0.01, 0.05]
+
+
+@pytest.fixture(scope='module')
+def statsmodels_power():
+    power = pytest.importorskip('statsmodels.stats.power')
+    return power.TTestIndPower()
+
+
+@pytest.mark.parametrize('alternative', ['two-sided', 'larger', 'smaller'])
+def test_power_matches_statsmodels(statsmodels_power, alternative):
+    grid = np.array(np.meshgrid(EFFECT_SIZES, NOBS1, RATIOS, ALPHAS, indexing='ij')).reshape(4, -1)
+    if alternative == 'smaller':
+        grid[0] = -grid[0]
+    expected = np.array([statsmodels_power.power(d, n, a, ratio=r, alternative=alternative) for d, n, r, a in grid.T])
+    actual = ttest_ind_power(grid[0], grid[1], alpha=grid[3], ratio=grid[2], alternative=alternative)
+    # statsmodels gives nan where the lower tail underflows; the engine gives
+    # the limit
+    finite = np.isfinite(expected)
+    np.testing.assert_allclose(actual[finite], expected[finite], rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(actual[~finite], 1.0, atol=1e-4)
+
+
+def test_solve_nobs1_matches_statsmodels(statsmodels_power):
+    for effect_size in EFFECT_SIZES:
+        for ratio in RATIOS:
+            expected = statsmodels_power.solve_power(effect_size, power=0.8, alpha=0.05, ratio=ratio)
+            assert solve_nobs1(effect_size, power=0.8, ratio=ratio) == pytest.approx(expected, rel=1e-6)
+
+
+def test_solve_effect_size_matches_statsmodels(statsmodels_power):
+    for nobs1 in NOBS1:
+        for ratio in RATIOS:
+            expected = statsmodels_power.solve_power(nobs1=nobs1, power=0.8, alpha=0.05, ratio=ratio)
+            effect_size = solve_effect_size(nobs1, power=0.8, ratio=ratio)
+            # statsmodels stops its root find earlier, so check the root itself
+            # tightly and only then the agreement between the two
+            assert statsmodels_power.power(effect_size, nobs1, 0.05, ratio=ratio) == pytest.approx(0.8, abs=1e-9)
+            assert effect_size == pytest.approx(expected, rel=1e-4)
+
+
+def test_engine_broadcasts_like_scalar_calls():
+    effect_sizes = np.array(EFFECT_SIZES)[:, None]
+    nobs1 = np.array(NOBS1)[None, :]
+    table = ttest_ind_power(effect_sizes, nobs1, deff=2.5)
+    assert table.shape == (len(EFFECT_SIZES), len(NOBS1))
+    assert table[1, 2] == ttest_ind_power(EFFECT_SIZES[1], NOBS1[2], deff=2.5)
+
+
+@pytest.mark.parametrize('tol', [1e-3, 1e-4, 1e-5])
+@pytest.mark.parametrize('alternative', ['two-sided', 'larger'])
+def test_normal_df_threshold_is_the_smallest_df_within_tol(tol, alternative):
+    threshold = normal_df_threshold(tol, 0.05, alternative)
+    assert normal_error(threshold, 0.05, alternative) <= tol
+    assert normal_error(threshold - 1, 0.05, alternative) > tol
+
+
+@pytest.mark.parametrize('tol', [1e-3, 1e-4])
+def test_select_power_stays_within_its_error_bound(tol):
+    threshold = normal_df_threshold(tol)
+    nc = np.linspace(-6, 6, 241)[:, None]
+    df = np.array([2, threshold - 1, threshold, 3 * threshold, 1e7])
+    result = select_power(nc, df, tol=tol)
+    exact = nct_power(nc, df)
+    assert result.engine == 'mixed'
+    assert result.error_bound <= tol
+    assert np.max(np.abs(result.power - exact)) <= result.error_bound + 1e-12
+    # Below the threshold the exact noncentral t is used
+    np.testing.assert_array_equal(result.power[:, :2], exact[:, :2])
+
+
+def test_select_power_reports_the_engine_used():
+    assert select_power(2.0, 10).engine == 'nct'
+    assert select_power(2.0, 10).error_bound == 0.0
+    large = select_power(2.0, 1e6)
+    assert large.engine == 'normal' and large.power == normal_power(2.0)
+    auto = ttest_ind_power_auto(0.12, 22_000, deff=5.2)
+    assert auto.power == pytest.approx(ttest_ind_power(0.12, 22_000, deff=5.2), abs=auto.error_bound)
@@ -0,0 +1,56 @@
+"""Tests for the precomputed slider-grid tables."""
+import numpy as np
+import pytest
+
+from teachmichigan import lookup
+from teachmichigan.design import required_fellows, teacher_power
+
+
+@pytest.fixture(scope='module')
+def table(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('lookup')
+    lookup.build(directory)
+    return lookup.LookupTable.load(directory)
+
+
+def test_power_matches_direct_computation(table):
+    n_teachers = np.array([0, 1, 7, 25, 333, 1000])
+    for icc in (0, 0.2, 0.5):
+        for effect_size in (0.03, 0.12, 0.24):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                direct = teacher_power(n_teachers, 0.37, effect_size, 22, icc=icc)
+            np.testing.assert_array_equal(table.power(n_teachers, 0.37, effect_size, 22, icc=icc),
+                                          np.where(np.isfinite(direct), direct, np.nan))
+
+
+def test_required_fellows_matches_direct_computation(table):
+    shares = np.array([0.01, 0.5, 0.99, 1.0])
+    for icc in (0, 0.2, 0.5):
+        for effect_size in (0.03, 0.12, 0.24):
+            direct = required_fellows(effect_size, shares, 22, icc=icc)
+            np.testing.assert_array_equal(table.required_fellows(effect_size, shares, 22, icc=icc), direct)
+
+
+def test_off_grid_inputs_are_declined(table):
+    assert table.power(25, 1.0, 0.1, 22) is None
+    assert table.power(25, 1.0, 0.12, 20) is None
+    assert table.required_fellows(0.12, 0.0, 22) is None
+    assert table.required_fellows(0.12, 1.0, 22, power=0.9) is None
+
+
+def test_arrays_of_grid_constants_are_declined(table):
+    assert table.power(25, 1.0, 0.12, students_per_teacher=np.array([20, 22])) is None
+    assert table.power(25, 1.0, 0.12, alpha=np.array([0.05, 0.1])) is None
+    assert table.required_fellows(0.12, 1.0, students_per_teacher=np.array([20, 22])) is None
+    assert table.required_fellows(0.12, 1.0, power=np.array([0.8, 0.9])) is None
+
+
+def test_calculator_falls_back_for_arrays(table, monkeypatch):
+    from teachmichigan import calculator
+
+    monkeypatch.setattr(calculator, 'default_table', lambda: table)
+    sizes = np.array([20, 22])
+    np.testing.assert_allclose(calculator.calculate_power(25, 1.0, 0.12, students_per_teacher=sizes),
+                               teacher_power(25, 1.0, 0.12, sizes))
+    np.testing.assert_array_equal(calculator.calculate_sample_size(0.12, 1.0, students_per_teacher=sizes),
+                                  2 * required_fellows(0.12, 1.0, sizes))
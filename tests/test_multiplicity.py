@@ -0,0 +1,45 @@
+"""Tests for power across several outcomes under multiplicity corrections."""
+import numpy as np
+import pytest
+
+from teachmichigan.design import teacher_power
+from teachmichigan.multiplicity import adjust, multiple_outcome_power
+
+
+def test_independent_outcomes_multiply():
+    p = teacher_power(60, 1.0, 0.2, icc=0.1)
+    result = multiple_outcome_power(60, 1.0, [0.2, 0.2, 0.2], correlation=0.0, icc=0.1, correction='none',
+                                    replicates=200_000, seed=1)
+    # Three times the Monte Carlo standard error of about 0.001
+    np.testing.assert_allclose(result.per_outcome, p, atol=0.004)
+    assert result.all == pytest.approx(p ** 3, abs=0.004)
+    assert result.any == pytest.approx(1 - (1 - p) ** 3, abs=0.004)
+
+
+def test_corrections_lower_power():
+    powers = [multiple_outcome_power(60, 1.0, [0.2, 0.2, 0.2], correlation=0.3, icc=0.1, correction=correction,
+                                     replicates=20_000, seed=1).per_outcome.mean()
+              for correction in ('none', 'bh', 'holm', 'bonferroni')]
+    assert powers == sorted(powers, reverse=True)
+
+
+def test_adjust_matches_the_textbook_procedures():
+    p_values = np.array([0.01, 0.035, 0.03, 0.2])
+    np.testing.assert_array_equal(adjust(p_values, correction='bonferroni'), [True, False, False, False])
+    # Holm: 0.01 <= 0.05/4, then 0.03 > 0.05/3 stops
+    np.testing.assert_array_equal(adjust(p_values, correction='holm'), [True, False, False, False])
+    # BH: the third smallest, 0.035 <= 0.05 * 3/4, carries the two below it
+    np.testing.assert_array_equal(adjust(p_values, correction='bh'), [True, True, True, False])
+    with pytest.raises(ValueError):
+        adjust(p_values, correction='sidak')
+
+
+def test_null_outcomes_are_rejected_at_the_corrected_level():
+    results = {correction: multiple_outcome_power(60, 1.0, [0.0, 0.0, 0.0], correlation=0.5, icc=0.1,
+                                                  correction=correction, replicates=40_000, seed=2)
+               for correction in ('none', 'bonferroni')}
+    # Monte Carlo standard errors are about 0.001 and 0.0006
+    np.testing.assert_allclose(results['none'].per_outcome, 0.05, atol=0.004)
+    np.testing.assert_allclose(results['bonferroni'].per_outcome, 0.05 / 3, atol=0.002)
+    # No outcome has an effect, so joint power is undefined
+    assert np.isnan(results['none'].all)
@@ -0,0 +1,23 @@
+"""Tests for the process-pool backend: results must not depend on the worker count."""
+import numpy as np
+
+from teachmichigan.design import power_surface
+from teachmichigan.parallel import parallel_power_surface, parallel_simulate_power
+
+
+def test_surface_matches_the_serial_surface():
+    args = ([10, 50, 200], [0.5, 1.0], [0.1, 0.2], [0.0, 0.2])
+    serial = power_surface(*args)
+    for workers, shards in ((1, 1), (2, 5), (3, 7)):
+        parallel = parallel_power_surface(*args, workers=workers, shards=shards)
+        assert parallel.dims == serial.dims
+        np.testing.assert_allclose(parallel.values, serial.values, rtol=1e-12)
+
+
+def test_simulation_does_not_depend_on_workers():
+    kwargs = dict(effect_size=[0.0, 0.3], icc=0.1, replicates=4000, seed=11, shards=8)
+    one = parallel_simulate_power(10, workers=1, **kwargs)
+    three = parallel_simulate_power(10, workers=3, **kwargs)
+    np.testing.assert_array_equal(one.rejections, three.rejections)
+    assert one.replicates == 4000
+    assert np.all(one.rejections <= 4000)
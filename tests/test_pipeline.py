@@ -0,0 +1,46 @@
+"""Tests for the dependency-tracked stages behind the app's reruns."""
+import numpy as np
+
+from teachmichigan.pipeline import Pipeline
+
+
+def test_stage_is_reused_until_a_dependency_changes():
+    state, calls = {}, []
+
+    def compute(value):
+        calls.append(value)
+        return value * 2
+
+    for value in (1, 1, 2, 2):
+        pipeline = Pipeline(state)
+        assert pipeline.run('double', (value,), lambda: compute(value)) == value * 2
+    assert calls == [1, 2]
+
+
+def test_counts_and_timings_cover_one_run():
+    pipeline = Pipeline()
+    pipeline.run('a', (1,), lambda: 1)
+    pipeline.run('a', (1,), lambda: 1)
+    pipeline.run('b', (np.arange(3),), lambda: 2)
+    assert (pipeline.hits, pipeline.misses) == (1, 2)
+    assert pipeline.recomputed == ['a', 'b']
+    assert set(pipeline.timings) == {'a', 'b'} and all(t >= 0 for t in pipeline.timings.values())
+
+
+def test_equal_arrays_and_numbers_count_as_unchanged():
+    state = {}
+    Pipeline(state).run('table', (np.array([0.1, 0.2]), 22), lambda: 'first')
+    pipeline = Pipeline(state)
+    assert pipeline.run('table', ([0.1, 0.2], 22.0), lambda: 'second') == 'first'
+    assert pipeline.hits == 1
+
+
+def test_unchanged_intermediate_stops_propagation():
+    # Two outcome shares that link the same number of fellows
+    state, recomputed = {}, []
+    for share in (0.5, 0.51):
+        pipeline = Pipeline(state)
+        linked = pipeline.run('linked', (25, share), lambda: int(25 * share))
+        pipeline.run('power', (linked,), lambda: linked / 100)
+        recomputed.append(pipeline.recomputed)
+    assert recomputed == [['linked', 'power'], ['linked']]
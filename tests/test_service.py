@@ -0,0 +1,141 @@
+"""Tests for the batching HTTP compute service."""
+import asyncio
+import json
+import logging
+
+import numpy as np
+import pytest
+
+from teachmichigan import service
+from teachmichigan.design import required_fellows, teacher_power
+from teachmichigan.service import BadRequest, Batcher, PowerService
+
+
+def test_prepare_broadcasts_lists_and_applies_defaults():
+    shape, arrays = service._prepare({'n_teachers': [10, 20], 'outcome_share': 1, 'effect_size': [[0.1], [0.2]]},
+                                     ('n_teachers', 'outcome_share', 'effect_size'), {})
+    assert shape == (2, 2)
+    np.testing.assert_array_equal(arrays['n_teachers'], [10, 20, 10, 20])
+    assert arrays['students_per_teacher'].tolist() == [22] * 4
+    # Without clustering the ICC is ignored
+    _, arrays = service._prepare({'n_teachers': 10, 'outcome_share': 1, 'effect_size': 0.2, 'icc': 0.2},
+                                 ('n_teachers', 'outcome_share', 'effect_size'), {})
+    assert arrays['icc'].tolist() == [0]
+
+
+@pytest.mark.parametrize('params', [{'outcome_share': 1, 'effect_size': 0.2},
+                                    {'n_teachers': 10, 'outcome_share': 1, 'effect_size': 0.2, 'ratio': 2},
+                                    {'n_teachers': 'ten', 'outcome_share': 1, 'effect_size': 0.2},
+                                    {'n_teachers': [10, 20, 30], 'outcome_share': [1, 0.5], 'effect_size': 0.2}])
+def test_prepare_rejects_bad_arguments(params):
+    with pytest.raises(BadRequest):
+        service._prepare(params, ('n_teachers', 'outcome_share', 'effect_size'), {})
+
+
+def test_handle_answers_like_the_design_functions():
+    async def main():
+        app = PowerService(window=0.001)
+        body = json.dumps({'n_teachers': [10, 50], 'outcome_share': 0.5, 'effect_size': 0.2,
+                           'use_clustering': True, 'icc': 0.1}).encode()
+        power = await app.handle('POST', '/power', body)
+        size = await app.handle('GET', '/sample-size?effect_size=0.12&outcome_share=[0,0.5]', b'')
+        return power, size
+
+    (status, power), (size_status, size) = asyncio.run(main())
+    assert status == size_status == 200
+    np.testing.assert_allclose(power['power'], teacher_power(np.array([10, 50]), 0.5, 0.2, icc=0.1), rtol=1e-12)
+    # No linked fellows has no finite answer, which JSON reports as null
+    assert size['fellows'] == [None, required_fellows(0.12, 0.5)]
+    assert size['required_teachers'][1] == 2 * size['fellows'][1]
+
+
+@pytest.mark.parametrize('method, target, body, status', [
+    ('POST', '/power', b'not json', 400),
+    ('POST', '/power', b'[1, 2]', 400),
+    ('POST', '/power', b'{"n_teachers": 10}', 400),
+    ('GET', '/unknown', b'', 404),
+    ('DELETE', '/power', b'', 405),
+])
+def test_handle_rejects_bad_requests(method, target, body, status):
+    code, payload = asyncio.run(PowerService().handle(method, target, body))
+    assert code == status
+    assert 'error' in payload
+
+
+def test_failed_batch_answers_500(caplog):
+    def fail(columns):
+        raise RuntimeError('boom')
+
+    async def main():
+        app = PowerService(window=0.001)
+        app.batchers['/power'] = Batcher(fail, window=0.001)
+        return await app.handle('POST', '/power', b'{"n_teachers": 10, "outcome_share": 1, "effect_size": 0.2}')
+
+    with caplog.at_level(logging.ERROR, logger='teachmichigan.service'):
+        assert asyncio.run(main()) == (500, {'error': 'calculation failed'})
+    assert 'batch of 1 requests failed' in caplog.text
+
+
+def test_concurrent_requests_are_coalesced_into_one_batch():
+    sizes = []
+
+    def compute(columns):
+        sizes.append(len(columns['x']))
+        return {'y': columns['x'] * 2}
+
+    async def main():
+        batcher = Batcher(compute, window=0.05)
+        requests = [((2,), {'x': np.array([i, i + 0.5])}) for i in range(10)]
+        results = await asyncio.gather(*(batcher.submit(request) for request in requests))
+        return batcher, results
+
+    batcher, results = asyncio.run(main())
+    assert sizes == [20]
+    assert (batcher.requests, batcher.batches) == (10, 1)
+    assert results[3] == {'y': [6.0, 7.0]}
+
+
+def test_max_batch_flushes_early():
+    def compute(columns):
+        return {'y': columns['x']}
+
+    async def main():
+        batcher = Batcher(compute, window=10, max_batch=3)
+        await asyncio.wait_for(asyncio.gather(*(batcher.submit(((1,), {'x': np.array([i])})) for i in range(3))), 5)
+        return batcher.batches
+
+    assert asyncio.run(main()) == 1
+
+
+async def _exchange(request):
+    app = PowerService(window=0.001)
+    server = await asyncio.start_server(app.serve_connection, '127.0.0.1', 0)
+    async with server:
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        writer.write(request)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_http_round_trip():
+    body = b'{"n_teachers": 25, "outcome_share": 1, "effect_size": 0.2}'
+    request = (b'POST /power HTTP/1.1\r\nContent-Type: application/json\r\nConnection: close\r\n'
+               b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+    status, payload = asyncio.run(_exchange(request))
+    assert status == 200
+    assert payload['power'] == pytest.approx(teacher_power(25, 1.0, 0.2))
+
+
+@pytest.mark.parametrize('request_bytes, status', [
+    (b'garbage\r\n\r\n', 400),
+    (b'POST /power HTTP/1.1\r\nContent-Length: nope\r\n\r\n', 400),
+    (b'POST /power HTTP/1.1\r\nContent-Length: -5\r\n\r\n', 400),
+    (b'POST /power HTTP/1.1\r\nContent-Length: ' + str(service.MAX_BODY + 1).encode() + b'\r\n\r\n', 413),
+])
+def test_http_rejects_malformed_requests(request_bytes, status):
+    code, payload = asyncio.run(_exchange(request_bytes))
+    assert code == status
+    assert 'error' in payload
@@ -0,0 +1,48 @@
+"""Tests for the Monte Carlo power of clustered teacher-level designs."""
+import numpy as np
+import pytest
+
+from teachmichigan.design import teacher_power
+from teachmichigan.engine import nct_power
+from teachmichigan.simulate import simulate_power, wilson_interval
+
+REPLICATES = 20_000
+# Three Monte Carlo standard errors of a proportion near 0.5
+TOLERANCE = 3 * np.sqrt(0.25 / REPLICATES)
+
+
+@pytest.mark.parametrize('analysis', ['cluster_mean', 'cluster_robust'])
+def test_type_one_error_is_alpha(analysis):
+    result = simulate_power(20, effect_size=0.0, icc=0.2, replicates=REPLICATES, analysis=analysis, seed=3)
+    assert result.power == pytest.approx(0.05, abs=3 * np.sqrt(0.05 * 0.95 / REPLICATES))
+
+
+def test_cluster_mean_power_matches_the_exact_noncentral_t():
+    # The t-test on teacher means is exact: noncentral t on 2n - 2 df
+    n, m, icc, effect_size = 20, 22, 0.2, 0.3
+    result = simulate_power(n, effect_size=effect_size, students_per_teacher=m, icc=icc, replicates=REPLICATES,
+                            seed=3)
+    exact = nct_power(effect_size / np.sqrt((icc + (1 - icc) / m) * 2 / n), 2 * n - 2)
+    assert result.power == pytest.approx(exact, abs=TOLERANCE)
+    # The analytic calculator's student-level df make it slightly optimistic
+    assert result.power == pytest.approx(teacher_power(n, 1.0, effect_size, m, icc=icc), abs=0.02)
+
+
+def test_effect_sizes_share_draws_and_are_reproducible():
+    first = simulate_power(10, effect_size=[0.0, 0.2, 0.4], icc=0.1, replicates=2000, seed=7)
+    second = simulate_power(10, effect_size=[0.0, 0.2, 0.4], icc=0.1, replicates=2000, seed=7)
+    np.testing.assert_array_equal(first.rejections, second.rejections)
+    assert np.all(np.diff(first.power) > 0)
+    assert np.all((first.ci_low <= first.power) & (first.power <= first.ci_high))
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(50, 100)
+    assert low == pytest.approx(0.4038, abs=1e-4) and high == pytest.approx(0.5962, abs=1e-4)
+
+
+def test_invalid_designs_are_rejected():
+    with pytest.raises(ValueError):
+        simulate_power(1, effect_size=0.2)
+    with pytest.raises(ValueError):
+        simulate_power(10, effect_size=0.2, analysis='ols')
@@ -0,0 +1,39 @@
+"""Tests for the three-level (student, teacher, school) designs."""
+import numpy as np
+import pytest
+
+from teachmichigan.design import teacher_power
+from teachmichigan.engine import nct_power
+from teachmichigan.threelevel import design_effect_3level, mdes_3level, power_3level, required_schools_3level
+
+
+def test_design_effect():
+    assert design_effect_3level(22, 1, icc_teacher=0.2) == pytest.approx(1 + 21 * 0.2)
+    assert design_effect_3level(20, 4, icc_teacher=0.1, icc_school=0.05) == pytest.approx(1 + 19 * 0.1 + 79 * 0.05)
+
+
+def test_power_uses_school_means_on_school_df():
+    schools, j, m, icc_teacher, icc_school = 15, 3, 20, 0.1, 0.05
+    variance = icc_school + icc_teacher / j + (1 - icc_school - icc_teacher) / (j * m)
+    expected = nct_power(0.25 / np.sqrt(2 / schools * variance), 2 * schools - 2)
+    assert power_3level(0.25, schools, j, m, icc_teacher, icc_school) == pytest.approx(expected)
+
+
+def test_one_teacher_per_school_without_school_icc_is_the_two_level_design():
+    # Same noncentrality as the teacher-level calculator; only its student df differ
+    power = power_3level(0.2, 200, 1, 22, icc_teacher=0.1)
+    assert power == pytest.approx(teacher_power(200, 1.0, 0.2, 22, icc=0.1), abs=1e-3)
+
+
+def test_mdes_and_required_schools_invert_power():
+    mdes = mdes_3level(15, 3, 20, 0.1, 0.05)
+    assert power_3level(mdes, 15, 3, 20, 0.1, 0.05) == pytest.approx(0.8, abs=1e-9)
+    schools = required_schools_3level(np.array([0.2, 0.4]), 3, 20, 0.1, 0.05)
+    for effect_size, k in zip([0.2, 0.4], schools):
+        assert power_3level(effect_size, k, 3, 20, 0.1, 0.05) >= 0.8
+        assert power_3level(effect_size, k - 1, 3, 20, 0.1, 0.05) < 0.8
+
+
+def test_unreachable_power_is_nan():
+    assert np.isnan(required_schools_3level(0.0, 3))
+    assert np.isnan(power_3level(0.2, 1, 3))